@@ -1,5 +1,8 @@
 import random
 import json
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 
 # Valid chatbot-executable actions
 VALID_ACTIONS = [
@@ -61,6 +64,92 @@ def generate_dataset(n=1000, save_path="agentic_chatbot_dataset_v3.jsonl"):
             f.write(json.dumps(row) + "\n")
     print(f"✅ Dataset saved to {save_path}")
 
+# Vectorized generation for large datasets. Actions are stored as int8 codes into ACTION_VOCAB,
+# with code 0 ("NONE") used for padded history slots.
+ACTION_VOCAB = ["NONE"] + VALID_ACTIONS
+ACTION_CODES = {action: i for i, action in enumerate(ACTION_VOCAB)}
+HISTORY_COLUMNS = ["last_action_1", "last_action_2", "last_action_3"]
+
+def _workflow_matrix():
+    import numpy as np
+    lengths = np.array([len(w) for w in REALISTIC_WORKFLOWS], dtype=np.int64)
+    matrix = np.zeros((len(REALISTIC_WORKFLOWS), lengths.max()), dtype=np.int8)
+    for i, workflow in enumerate(REALISTIC_WORKFLOWS):
+        matrix[i, :len(workflow)] = [ACTION_CODES[a] for a in workflow]
+    return matrix, lengths
+
+def generate_arrays(n, rng):
+    # Same sampling as generate_agentic_data_entry, done for n rows at once
+    import numpy as np
+    matrix, lengths = _workflow_matrix()
+    workflow = rng.integers(0, len(REALISTIC_WORKFLOWS), size=n)
+    length = lengths[workflow]
+    action_index = 1 + (rng.random(n) * (length - 1)).astype(np.int64)
+
+    columns = {"current_page": rng.integers(0, len(PAGES), size=n).astype(np.int8)}
+    for slot, name in enumerate(HISTORY_COLUMNS):
+        position = action_index - (3 - slot)
+        columns[name] = np.where(position >= 0, matrix[workflow, np.maximum(position, 0)], 0).astype(np.int8)
+    columns["action"] = matrix[workflow, action_index]
+    return columns
+
+def _write_jsonl(columns, path):
+    import numpy as np
+    pages = np.array(PAGES, dtype=object)[columns["current_page"]]
+    names = np.array([None] + VALID_ACTIONS, dtype=object)
+    history = [names[columns[c]] for c in HISTORY_COLUMNS]
+    actions = names[columns["action"]]
+    with open(path, "w") as f:
+        f.writelines(
+            json.dumps({"current_page": p, "last_action_1": a1, "last_action_2": a2, "last_action_3": a3, "action": a}) + "\n"
+            for p, a1, a2, a3, a in zip(pages, *history, actions)
+        )
+
+def generate_shard(shard_index, rows, seed, out_dir, fmt="npz"):
+    # Each shard has its own seed stream, so output doesn't depend on how shards are spread over workers
+    import numpy as np
+    rng = np.random.default_rng([seed, shard_index])
+    columns = generate_arrays(rows, rng)
+    path = os.path.join(out_dir, f"shard-{shard_index:05d}.{fmt}")
+    if fmt == "npz":
+        np.savez_compressed(path, action_vocab=np.array(ACTION_VOCAB), page_vocab=np.array(PAGES), **columns)
+    elif fmt == "jsonl":
+        _write_jsonl(columns, path)
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+    return path
+
+def generate_sharded_dataset(n, out_dir="dataset_shards", shard_size=1_000_000, seed=0, fmt="npz", workers=None):
+    os.makedirs(out_dir, exist_ok=True)
+    sizes = [min(shard_size, n - start) for start in range(0, n, shard_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(generate_shard, i, rows, seed, out_dir, fmt) for i, rows in enumerate(sizes)]
+        paths = [future.result() for future in futures]
+    print(f"✅ {n} rows saved to {len(paths)} shard(s) in {out_dir}")
+    return paths
+
+def load_shard(path):
+    # Returns the npz columns decoded back to action/page names (None for padded history slots)
+    import numpy as np
+    with np.load(path) as shard:
+        names = np.array([None] + list(shard["action_vocab"][1:]), dtype=object)
+        pages = np.array(list(shard["page_vocab"]), dtype=object)
+        decoded = {c: names[shard[c]] for c in HISTORY_COLUMNS + ["action"]}
+        decoded["current_page"] = pages[shard["current_page"]]
+    return decoded
+
 # If running this script directly
 if __name__ == "__main__":
-    generate_dataset(n=2000)
+    parser = argparse.ArgumentParser(description="Generate synthetic action-predictor training data")
+    parser.add_argument("--rows", type=int, default=None, help="rows to generate with the vectorized, sharded generator")
+    parser.add_argument("--shard-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["npz", "jsonl"], default="npz")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="dataset_shards")
+    args = parser.parse_args()
+
+    if args.rows is None:
+        generate_dataset(n=2000)
+    else:
+        generate_sharded_dataset(args.rows, args.out, args.shard_size, args.seed, args.format, args.workers)
@@ -1,9 +1,13 @@
 import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, f1_score
-import matplotlib.pyplot as plt
 import json
 import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+import argparse
+import glob
+import os
 
 FUNCTION_MAP = {
     'None': 0, 
@@ -25,8 +29,36 @@ PAGE_MAP = {
     'select_customer': 1,
 }
 
-def load_data():
-    path = "agentic_chatbot_dataset_v3.jsonl"
+# Both training paths write their outputs next to predict.py, which loads them from there
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASET_PATH = os.path.join(BASE_DIR, "agentic_chatbot_dataset_v3.jsonl")
+MODEL_PATH = os.path.join(BASE_DIR, "action_predictor_model.json")
+FEATURES_PATH = os.path.join(BASE_DIR, "features.txt")
+VOCAB_PATH = os.path.join(BASE_DIR, "feature_vocab.json")
+
+# One-hot columns over a fixed vocabulary, in the same order for every training path
+ACTION_VOCAB = ['NONE'] + [action for action in FUNCTION_MAP if action != 'None']
+HISTORY_COLUMNS = ['last_action_1', 'last_action_2', 'last_action_3']
+FEATURE_NAMES = [f'{column}_{action}' for column in HISTORY_COLUMNS for action in ACTION_VOCAB]
+
+def save_vocabulary(features_path=FEATURES_PATH, vocab_path=VOCAB_PATH):
+    # Written only next to a newly saved model: features.txt is predict.py's fallback column order for
+    # models saved without feature names, and the vocabulary pins the action -> column mapping
+    with open(features_path, "w") as f:
+        for name in FEATURE_NAMES:
+            f.write(name + "\n")
+    with open(vocab_path, "w") as f:
+        json.dump({"actions": ACTION_VOCAB, "history_columns": HISTORY_COLUMNS, "features": FEATURE_NAMES}, f, indent=4)
+
+def mark_sparse(model):
+    # Absent one-hot columns are missing values in both training paths; predict.py encodes to match
+    model.set_attr(zero_is_missing="1")
+
+def _dense_matrix(X, y):
+    # Named columns are saved with the model, so predict.py encodes in the order it was trained on
+    return xgb.DMatrix(X.astype(np.float32), label=y, missing=0.0, feature_names=FEATURE_NAMES)
+
+def load_data(path=DATASET_PATH):
     data = []
     with open(path, 'r') as f:
         for line in f:
@@ -36,20 +68,35 @@ def load_data():
     df.fillna('NONE', inplace=True) 
             
     #print(data[:5]) 
-    X = pd.get_dummies(df[['last_action_1', 'last_action_2', 'last_action_3']])
+    X = pd.get_dummies(df[HISTORY_COLUMNS]).reindex(columns=FEATURE_NAMES, fill_value=0)
     y = df['action'].map(FUNCTION_MAP)
     
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.1, random_state=21)
     
-    with open("features.txt", "w") as f:
-        for col in X_train.columns:
-            f.write(col + "\n")
-    
     return X_train, X_test, y_train, y_test    
 
-def train_model(X_train, y_train, X_test=None, y_test=None):
-    dtrain = xgb.DMatrix(X_train, label=y_train)
-    dtest = xgb.DMatrix(X_test, label=y_test)
+def plot_losses(evals_result, headless=False, path="training_loss.png"):
+    import matplotlib
+    if headless:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.plot(evals_result['train']['mlogloss'], label='Train Loss')
+    plt.plot(evals_result['eval']['mlogloss'], label='Validation Loss')
+    plt.xlabel('Boosting Rounds')
+    plt.ylabel('Log Loss')
+    plt.title('Training vs Validation Loss')
+    plt.legend()
+    if headless:
+        plt.savefig(path)
+        plt.close()
+        print(f"Loss curve saved to {path}")
+    else:
+        plt.show()
+
+def train_model(X_train, y_train, X_test=None, y_test=None, headless=False):
+    dtrain = _dense_matrix(X_train, y_train)
+    dtest = _dense_matrix(X_test, y_test)
     params = {
         'objective': 'multi:softmax',
         'num_class': 12, #Adjust based on your dataset
@@ -61,38 +108,130 @@ def train_model(X_train, y_train, X_test=None, y_test=None):
     watchlist = [(dtrain, 'train'), (dtest, 'eval')]
     evals_result = {}
     model = xgb.train(params, dtrain, num_boost_round=100, evals=watchlist, early_stopping_rounds=10, evals_result=evals_result)
-    train_log = evals_result['train']['mlogloss']
-    val_log = evals_result['eval']['mlogloss']
-
-    plt.plot(train_log, label='Train Loss')
-    plt.plot(val_log, label='Validation Loss')
-    plt.xlabel('Boosting Rounds')
-    plt.ylabel('Log Loss')
-    plt.title('Training vs Validation Loss')
-    plt.legend()
-    plt.show()
+    mark_sparse(model)
+    plot_losses(evals_result, headless)
     return model
 
 def evaluate_model(model, X_test, y_test):
-    dtest = xgb.DMatrix(X_test, label=y_test)
+    dtest = _dense_matrix(X_test, y_test)
     y_pred = model.predict(dtest)
 
     accuracy = accuracy_score(y_test, y_pred)
     f1 = f1_score(y_test, y_pred, average='weighted')
     print(f"Test Accuracy: {accuracy:.4f}, F1 Score: {f1:.4f}")
-    model.save_model('action_predictor_model.json')
+    save_vocabulary()
+    model.save_model(MODEL_PATH)
     
+# Streaming training: shards (from agentic_dataset_generator.py) are read one at a time and turned into
+# sparse one-hot rows over the fixed vocabulary above, so memory doesn't grow with the dataset.
+def _read_shard(path):
+    # Returns (history codes of shape (n, 3) into ACTION_VOCAB, labels)
+    codes = {action: i for i, action in enumerate(ACTION_VOCAB)}
+    if path.endswith(".npz"):
+        with np.load(path) as shard:
+            shard_vocab = [str(a) for a in shard["action_vocab"]]
+            remap = np.array([codes.get(a, 0) for a in shard_vocab], dtype=np.int64)
+            history = np.stack([remap[shard[c]] for c in HISTORY_COLUMNS], axis=1)
+            labels = np.array([FUNCTION_MAP.get(a, 0) for a in shard_vocab], dtype=np.float32)[shard["action"]]
+        return history, labels
+
+    rows = []
+    with open(path, 'r') as f:
+        for line in f:
+            rows.append(json.loads(line))
+    history = np.array([[codes.get(row[c] or 'NONE', 0) for c in HISTORY_COLUMNS] for row in rows], dtype=np.int64)
+    labels = np.array([FUNCTION_MAP.get(row['action'], 0) for row in rows], dtype=np.float32)
+    return history, labels
+
+def to_csr(history):
+    # Exactly one active column per history slot
+    n = history.shape[0]
+    indices = (history + np.arange(len(HISTORY_COLUMNS)) * len(ACTION_VOCAB)).ravel()
+    indptr = np.arange(0, n * len(HISTORY_COLUMNS) + 1, len(HISTORY_COLUMNS))
+    data = np.ones(len(indices), dtype=np.float32)
+    return sp.csr_matrix((data, indices, indptr), shape=(n, len(FEATURE_NAMES)))
+
+class ShardIterator(xgb.DataIter):
+    def __init__(self, paths, cache_prefix=None):
+        self.paths = list(paths)
+        self._index = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._index == len(self.paths):
+            return 0
+        history, labels = _read_shard(self.paths[self._index])
+        input_data(data=to_csr(history), label=labels, feature_names=FEATURE_NAMES)
+        self._index += 1
+        return 1
+
+    def reset(self):
+        self._index = 0
+
+def train_streaming(shard_glob, eval_fraction=0.1, external_memory=False, cache_dir=os.path.join(BASE_DIR, "xgb_cache"),
+                    num_boost_round=100, headless=True):
+    paths = sorted(glob.glob(shard_glob))
+    if not paths:
+        raise FileNotFoundError(f"No shards match {shard_glob}")
+    n_eval = max(1, int(len(paths) * eval_fraction)) if len(paths) > 1 else 0
+    train_paths, eval_paths = paths[:len(paths) - n_eval], paths[len(paths) - n_eval:]
+
+    if external_memory:
+        # Pages are cached on disk and streamed during training instead of being held in memory
+        os.makedirs(cache_dir, exist_ok=True)
+        dtrain = xgb.DMatrix(ShardIterator(train_paths, cache_prefix=os.path.join(cache_dir, "train")))
+    else:
+        dtrain = xgb.QuantileDMatrix(ShardIterator(train_paths))
+
+    params = {
+        'objective': 'multi:softmax',
+        'num_class': 12,
+        'max_depth': 4,
+        'eval_metric': 'mlogloss',
+        'learning_rate': 0.1,
+        'tree_method': 'hist',
+        'nthread': os.cpu_count(),
+    }
+
+    evals_result = {}
+    watchlist = [(dtrain, 'train')]
+    if eval_paths:
+        history, labels = zip(*(_read_shard(p) for p in eval_paths))
+        deval = xgb.DMatrix(to_csr(np.concatenate(history)), label=np.concatenate(labels), feature_names=FEATURE_NAMES)
+        watchlist.append((deval, 'eval'))
+
+    model = xgb.train(params, dtrain, num_boost_round=num_boost_round, evals=watchlist,
+                      early_stopping_rounds=10 if eval_paths else None, evals_result=evals_result)
+    if eval_paths:
+        plot_losses(evals_result, headless)
+
+    mark_sparse(model)
+    save_vocabulary()
+    model.save_model(MODEL_PATH)
+    print(f"✅ Trained on {len(train_paths)} shard(s); model saved to {MODEL_PATH}")
+    return model
+
 def main():
     X_train, X_test, y_train, y_test = load_data()
     
     print(X_train[:5], y_train[:5]) 
     
     """model = train_model(X_train, y_train, X_test, y_test)
-    y_pred = model.predict(xgb.DMatrix(X_train))
+    y_pred = model.predict(_dense_matrix(X_train, y_train))
     print("Train Accuracy: ", accuracy_score(y_train, y_pred))
     
     evaluate_model(model, X_test, y_test)"""
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Train the next-action predictor")
+    parser.add_argument("--shards", help="glob of .npz/.jsonl shards for streaming training, e.g. 'dataset_shards/*.npz'")
+    parser.add_argument("--external-memory", action="store_true", help="cache training pages on disk instead of in memory")
+    parser.add_argument("--rounds", type=int, default=100)
+    parser.add_argument("--show-plot", action="store_true", help="open the loss plot window instead of saving it")
+    args = parser.parse_args()
+
+    if args.shards:
+        train_streaming(args.shards, external_memory=args.external_memory, num_boost_round=args.rounds, headless=not args.show_plot)
+    else:
+        main()
 
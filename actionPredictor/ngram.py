@@ -0,0 +1,116 @@
+import atexit
+import os
+import threading
+import time
+
+import numpy as np
+
+from .predict import ACTIONS, BASE_DIR
+
+NGRAM_PATH = os.environ.get("INVOICE_AGENT_NGRAM_PATH", os.path.join(BASE_DIR, "ngram_counts.npz"))
+SNAPSHOT_INTERVAL_S = float(os.environ.get("INVOICE_AGENT_NGRAM_SNAPSHOT_S", "60"))
+MIN_SUPPORT = int(os.environ.get("INVOICE_AGENT_NGRAM_MIN_SUPPORT", "3"))
+
+class NgramModel:
+    """Next-action counts learned from live sessions, backing off from 3 to 2 to 1 previous actions."""
+
+    def __init__(self, actions=ACTIONS, path=NGRAM_PATH, snapshot_interval_s=SNAPSHOT_INTERVAL_S, min_support=MIN_SUPPORT):
+        self.actions = list(actions)
+        self.index = {action: i for i, action in enumerate(self.actions)}
+        self.path = path
+        self.snapshot_interval_s = snapshot_interval_s
+        self.min_support = min_support
+        v = len(self.actions)
+        # counts[n] is indexed by the last n actions (oldest first) and then the next action
+        self.counts = [np.zeros((v,) * (n + 1), dtype=np.int32) for n in range(4)]
+        # totals[n] caches counts[n].sum(-1) so a lookup never has to sum
+        self.totals = [np.zeros((v,) * n, dtype=np.int32) for n in range(4)]
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_snapshot = time.monotonic()
+        self.updates = 0
+        self.load()
+
+    def _codes(self, history):
+        # Actions outside the vocabulary (unknown, show_more, job_status, ...) break the chain
+        codes = []
+        for action in list(history)[-3:]:
+            code = self.index.get(action)
+            codes = [] if code is None else codes + [code]
+        return codes
+
+    def update(self, history, action):
+        code = self.index.get(action)
+        if code is None:
+            return
+        codes = self._codes(history)
+        with self._lock:
+            for n in range(len(codes) + 1):
+                context = tuple(codes[len(codes) - n:])
+                self.counts[n][context + (code,)] += 1
+                self.totals[n][context] += 1
+            self._dirty = True
+            self.updates += 1
+            due = time.monotonic() - self._last_snapshot >= self.snapshot_interval_s
+        if due:
+            self.snapshot()
+
+    def top_k(self, history, k: int=3):
+        """Returns [(action, probability)] from the longest history suffix seen at least min_support times."""
+        codes = self._codes(history)
+        for n in range(len(codes), -1, -1):
+            context = tuple(codes[len(codes) - n:])
+            total = int(self.totals[n][context])
+            if total >= self.min_support or (n == 0 and total):
+                row = self.counts[n][context]
+                best = np.argpartition(row, -k)[-k:] if k < len(row) else np.arange(len(row))
+                best = best[np.argsort(-row[best], kind="stable")]
+                return [(self.actions[i], float(row[i]) / total) for i in best if row[i]]
+        return []
+
+    def support(self, history) -> int:
+        codes = self._codes(history)
+        return int(self.totals[len(codes)][tuple(codes)])
+
+    def snapshot(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            arrays = {f"counts_{n}": c.copy() for n, c in enumerate(self.counts)}
+            self._dirty = False
+            self._last_snapshot = time.monotonic()
+        tmp_path = self.path + ".tmp.npz"
+        try:
+            np.savez_compressed(tmp_path, actions=np.array(self.actions), **arrays)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save n-gram counts: {e}")
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as snapshot:
+                saved = [str(a) for a in snapshot["actions"]]
+                if saved != self.actions:
+                    print("Ignoring n-gram snapshot saved with a different action vocabulary")
+                    return
+                counts = [snapshot[f"counts_{n}"].astype(np.int32) for n in range(4)]
+        except Exception as e:
+            print(f"Failed to load n-gram counts: {e}")
+            return
+        with self._lock:
+            self.counts = counts
+            self.totals = [np.array(c.sum(axis=-1), dtype=np.int32) for c in counts]
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_ngram_model() -> NgramModel:
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = NgramModel()
+                atexit.register(_model.snapshot)
+    return _model
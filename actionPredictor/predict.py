@@ -1,9 +1,9 @@
-import xgboost as xgb
-import pandas as pd
+import numpy as np
 import os
+import threading
 
 FUNCTION_MAP = {
-    'None': 0, 
+    'None': 0,
     'open_editor': 1,
     'add_service' : 2,
     'close_editor' : 3,
@@ -17,50 +17,90 @@ FUNCTION_MAP = {
     'update_tax' : 11
 }
 
+ACTIONS = list(FUNCTION_MAP.keys())
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, "action_predictor_model.json")
+FEATURES_PATH = os.path.join(BASE_DIR, "features.txt")
+
+class ActionPredictor:
+    """Keeps the XGBoost model and feature index in memory and predicts next actions for many histories at once."""
+
+    def __init__(self, model_path=MODEL_PATH, features_path=FEATURES_PATH):
+        # Imported here so the n-gram model (and anything else that only needs ACTIONS) doesn't load xgboost
+        import xgboost as xgb
+        self.model = xgb.Booster()
+        self.model.load_model(model_path)
+
+        # The model's own feature names give the column order it was trained on; features.txt covers models saved without them
+        self.feature_names = list(self.model.feature_names or [])
+        if not self.feature_names:
+            with open(features_path) as f:
+                self.feature_names = [line.strip() for line in f if line.strip()]
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        # Models from model.py treat absent one-hot columns as missing (CSR in training); older models saw dense zeros
+        self.missing = 0.0 if self.model.attr("zero_is_missing") == "1" else np.nan
+
+    def encode(self, histories):
+        # One row per history; the three slots are one-hot encoded as last_action_<slot>_<action>
+        X = np.zeros((len(histories), len(self.feature_names)), dtype=np.float32)
+        for row, acts in enumerate(histories):
+            acts = list(acts)[-3:]
+            padded = ['NONE'] * (3 - len(acts)) + [act or 'NONE' for act in acts]
+            for i, act in enumerate(padded):
+                col = self.feature_index.get(f'last_action_{i+1}_{act}')
+                if col is not None:
+                    X[row, col] = 1.0
+        return X
+
+    def predict(self, histories):
+        if not histories:
+            return []
+        predictions = self.model.inplace_predict(self.encode(histories), missing=self.missing)
+        return [ACTIONS[int(pred)] for pred in predictions]
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = ActionPredictor()
+    return _predictor
+
 def predict_action(last_actions):
+    # Counts learned from live sessions win once this exact history has been seen often enough;
+    # the XGBoost model (trained on synthetic workflows) covers the rest
+    from .ngram import get_ngram_model
+    ngram = get_ngram_model()
+    if len(last_actions) < 3 or ngram.support(last_actions) >= ngram.min_support:
+        ranked = ngram.top_k(last_actions, k=1)
+        if ranked:
+            print(f"Predicted actions (live n-gram): {[ranked[0][0]]}")
+            return [ranked[0][0]]
     if len(last_actions) < 3:
         print("Not enough actions to predict. Need at least 3 actions.")
         return [""]
-        
-    
-    model = xgb.Booster()
-    model.load_model("../actionPredictor/action_predictor_model.json")
-    last_actions = [last_actions]
-    
-    with open("../actionPredictor/features.txt") as f:
-        feature_names = [line.strip() for line in f]
-
-    # Initialize list of dicts
-    rows = []
-    for acts in last_actions:
-        row = {col: False for col in feature_names}
-        for i, act in enumerate(acts):
-            key = f'last_action_{i+1}_{act}'
-            if key in row:
-                row[key] = True
-        rows.append(row)
-
-    # Create DataFrame
-    df = pd.DataFrame(rows)
-    df = df.reindex(columns=feature_names, fill_value=False)
-    X = xgb.DMatrix(df)
-    
-    predictions = model.predict(X)
-    predicted_actions = [list(FUNCTION_MAP.keys())[int(pred)] for pred in predictions]
-    
+
+    predicted_actions = get_predictor().predict([last_actions])
+
     print(f"Predicted actions: {predicted_actions}")
     return predicted_actions
 
+def predict_actions(histories):
+    return get_predictor().predict(histories)
+
 def main():
-    
-    model = xgb.Booster()
-    model.load_model("action_predictor_model.json")
+
+    predictor = get_predictor()
     """last_actions = [
         ['open_editor', 'list_services', 'add_service'],
         ['open_editor', 'view_last_invoice', 'edit_customer']
     ]"""
-    
-    #predict_action(model, last_actions)
+
+    #predictor.predict(last_actions)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
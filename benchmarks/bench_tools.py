@@ -0,0 +1,271 @@
+"""Offline benchmark for the functions in src/tools.py.
+
+Builds a synthetic application directory (data/, columns/, titles/, categories/, template.xlsx),
+replaces the invoiceEditor modules with small stand-ins that work on those files, then times
+every function_map command against it.
+
+    python benchmarks/bench_tools.py --services 5 --customers 500 --columns 4 --months 12 --output bench.json
+"""
+import argparse
+import calendar
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+FIXED_TITLES = [
+    {"id": "fixed_1", "title": "Customer Name"},
+    {"id": "fixed_2", "title": "Unit Price"},
+    {"id": "fixed_3", "title": "Consumption Period"},
+    {"id": "fixed_4", "title": "Usage %"},
+    {"id": "fixed_5", "title": "Amount"},
+    {"id": "fixed_6", "title": "Total"},
+    {"id": "fixed_7", "title": "Category"},
+]
+MONTHS = list(calendar.month_name)[1:]
+
+def _months_back(count):
+    # Sheet names for the last `count` months, oldest first, ending with the current month
+    now = datetime.now().month - 1
+    return [MONTHS[(now - i) % 12] for i in reversed(range(count))]
+
+def build_fixture(workdir, services, customers, columns, months, seed=0):
+    rng = random.Random(seed)
+    for folder in ("data", "columns", "titles", "categories"):
+        os.makedirs(os.path.join(workdir, folder), exist_ok=True)
+
+    header = [t["title"] for t in FIXED_TITLES if t["id"] not in ("fixed_5", "fixed_6")]
+    with pd.ExcelWriter(os.path.join(workdir, "template.xlsx")) as writer:
+        for month in MONTHS:
+            pd.DataFrame(columns=header).to_excel(writer, sheet_name=month, index=False)
+    with open(os.path.join(workdir, "titles_config.json"), "w") as f:
+        json.dump(FIXED_TITLES, f, indent=4)
+
+    taxes = {}
+    for s in range(services):
+        service = f"Service{s + 1}"
+        custom = [{"title": f"Extra Field {c + 1}", "type": rng.choice(["text", "number"])} for c in range(columns)]
+        with open(os.path.join(workdir, "columns", f"{service}.json"), "w") as f:
+            json.dump(custom, f, indent=4)
+        with open(os.path.join(workdir, "titles", f"{service}.json"), "w") as f:
+            json.dump(FIXED_TITLES, f, indent=4)
+        with open(os.path.join(workdir, "categories", f"{service}.json"), "w") as f:
+            json.dump(["Standard", "Premium"], f, indent=4)
+        taxes[service] = {"cgst": 0.09, "sgst": 0.09}
+
+        with pd.ExcelWriter(os.path.join(workdir, "data", f"{service}.xlsx")) as writer:
+            for month in _months_back(months):
+                rows = {
+                    "Customer Name": [f"Customer {c + 1}" for c in range(customers)],
+                    "Category": [rng.choice(["Standard", "Premium"]) for _ in range(customers)],
+                    "Unit Price": [rng.randint(1, 100) * 10 for _ in range(customers)],
+                    "Consumption Period": [month] * customers,
+                    "Usage %": [rng.randint(1, 100) for _ in range(customers)],
+                }
+                for col in custom:
+                    rows[col["title"]] = [rng.randint(0, 1000) if col["type"] == "number" else f"v{rng.randint(0, 99)}" for _ in range(customers)]
+                pd.DataFrame(rows).to_excel(writer, sheet_name=month, index=False)
+
+    with open(os.path.join(workdir, "taxes.json"), "w") as f:
+        json.dump(taxes, f, indent=4)
+
+def install_invoice_editor_stubs():
+    # Stand-ins for invoiceEditor's update_excel/admin_fn, working on the synthetic files in the current directory
+    def _path(service):
+        return os.path.join("data", f"{service}.xlsx")
+
+    def _taxes():
+        with open("taxes.json") as f:
+            return json.load(f)
+
+    def your_invoice_function(action="generate", service=None):
+        sheets = pd.ExcelFile(_path(service)).sheet_names
+        sheet = sheets[-1] if action == "generate" or len(sheets) < 2 else sheets[-2]
+        df = pd.read_excel(_path(service), sheet_name=sheet)
+        tax = _taxes().get(service, {"cgst": 0.0, "sgst": 0.0})
+        df["Amount"] = df["Unit Price"] * df["Usage %"] / 100
+        df["CGST"] = df["Amount"] * tax["cgst"]
+        df["SGST"] = df["Amount"] * tax["sgst"]
+        df["Total"] = df["Amount"] + df["CGST"] + df["SGST"]
+        return df
+
+    def get_services():
+        return sorted(f[:-5] for f in os.listdir("data") if f.endswith(".xlsx"))
+
+    def get_customers(service):
+        sheet = pd.ExcelFile(_path(service)).sheet_names[-1]
+        return pd.read_excel(_path(service), sheet_name=sheet, usecols=["Customer Name"])["Customer Name"].tolist()
+
+    def copy_previous_data(service):
+        sheets = pd.read_excel(_path(service), sheet_name=None)
+        current = datetime.now().strftime("%B")
+        sheets[current] = list(sheets.values())[-1].copy()
+        with pd.ExcelWriter(_path(service)) as writer:
+            for name, df in sheets.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+
+    def load_service_columns(service):
+        with open(os.path.join("columns", f"{service}.json")) as f:
+            return json.load(f)
+
+    def load_service_titles(service):
+        with open(os.path.join("titles", f"{service}.json")) as f:
+            return json.load(f)
+
+    def get_service_tax(service):
+        return _taxes().get(service, {})
+
+    def update_service_tax(service, cgst, sgst):
+        taxes = _taxes()
+        taxes[service] = {"cgst": cgst, "sgst": sgst}
+        with open("taxes.json", "w") as f:
+            json.dump(taxes, f, indent=4)
+
+    update_excel = types.ModuleType("update_excel")
+    for func in (your_invoice_function, get_services, get_customers, copy_previous_data, get_service_tax, update_service_tax):
+        setattr(update_excel, func.__name__, func)
+    admin_fn = types.ModuleType("admin_fn")
+    for func in (load_service_columns, load_service_titles):
+        setattr(admin_fn, func.__name__, func)
+    sys.modules["update_excel"] = update_excel
+    sys.modules["admin_fn"] = admin_fn
+
+def load_function_map():
+    try:
+        from src.agent import function_map
+        return function_map
+    except ImportError:
+        # The LLM stack isn't needed to benchmark the tools; mirror the command table instead
+        from src import tools
+        return {
+            'add_service': tools.add_service,
+            'view_last_invoice': tools.view_invoice_for_service,
+            'list_services': tools.list_services,
+            'view_current_invoice': tools.view_current_invoice_for_service,
+            'copy_previous_data': tools.copy_previous,
+            'list_customers': tools.list_customers,
+            'add_customer': tools.add_customer_button,
+            'edit_customer': tools.edit_customer,
+            'update_tax': tools.update_tax_rates,
+        }
+
+def command_args(command, service, counter):
+    if command == 'add_service':
+        return {"service_name": f"Bench{counter}"}
+    if command == 'list_services':
+        return {}
+    if command == 'edit_customer':
+        return {"service_name": service, "customer_name": "Customer 1"}
+    if command == 'update_tax':
+        return {"service_name": service, "cgst": "9%", "sgst": "9%"}
+    if command in ('show_more', 'job_status'):
+        return None
+    return {"service_name": service}
+
+def cold_reset():
+    # Drops everything a first request would miss: file-derived caches, materialized invoices and prefetched results
+    from src import tools
+    tools.invalidate_service()
+    tools.invoice_summaries.invalidate()
+    agent = sys.modules.get("src.agent")
+    if agent is not None:
+        agent.prefetcher.invalidate()
+
+def measure(func, kwargs, repeat, reset):
+    timings, peaks, blocks = [], [], []
+    for i in range(repeat):
+        if reset:
+            reset()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        func(**kwargs)
+        timings.append((time.perf_counter() - start) * 1000)
+        after = tracemalloc.take_snapshot()
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        blocks.append(sum(max(stat.count_diff, 0) for stat in after.compare_to(before, "filename")))
+    timings.sort()
+    return {
+        "runs": repeat,
+        "median_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(0.95 * len(timings)))], 3),
+        "min_ms": round(timings[0], 3),
+        "peak_memory_bytes": max(peaks),
+        "net_allocated_blocks": int(statistics.median(blocks)),
+    }
+
+def run(args):
+    workdir = args.workdir or tempfile.mkdtemp(prefix="invoice-bench-")
+    build_fixture(workdir, args.services, args.customers, args.columns, args.months, args.seed)
+    install_invoice_editor_stubs()
+
+    from flask import Flask
+    app = Flask("invoice_bench")
+    app.add_url_rule("/add_customer", "add_customer", lambda: "")
+    app.add_url_rule("/update_customer", "update_customer", lambda: "")
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        function_map = load_function_map()
+        service = "Service1"
+        results = {}
+        with app.test_request_context():
+            for counter, (command, func) in enumerate(function_map.items()):
+                kwargs = command_args(command, service, counter)
+                if kwargs is None:
+                    continue
+                results[command] = {
+                    "cold": measure(func, kwargs, 1 if command == 'add_service' else args.repeat, cold_reset),
+                    "warm": measure(func, kwargs, args.repeat, None) if command != 'add_service' else None,
+                }
+                print(f"{command:22s} cold {results[command]['cold']['median_ms']:10.2f} ms"
+                      + (f"   warm {results[command]['warm']['median_ms']:10.2f} ms" if results[command]['warm'] else ""))
+    finally:
+        os.chdir(cwd)
+        if not args.workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "config": {"services": args.services, "customers": args.customers, "columns": args.columns,
+                   "months": args.months, "repeat": args.repeat, "seed": args.seed},
+        "python": sys.version.split()[0],
+        "pandas": pd.__version__,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark src/tools.py against synthetic service workbooks")
+    parser.add_argument("--services", type=int, default=3)
+    parser.add_argument("--customers", type=int, default=200)
+    parser.add_argument("--columns", type=int, default=3, help="custom columns per service")
+    parser.add_argument("--months", type=int, default=3, help="monthly sheets per workbook")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write machine-readable JSON results here")
+    parser.add_argument("--workdir", help="build the fixture here instead of a temporary directory")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary fixture directory")
+    run(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
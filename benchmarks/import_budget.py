@@ -0,0 +1,93 @@
+"""Import-time budget for the agent's entry points.
+
+Imports a module in a fresh interpreter with ``-X importtime``. It then reports the slowest
+top-level packages and fails if the import exceeds the budget or pulls in a dependency that
+should only load on first use.
+
+    python benchmarks/import_budget.py --module src.agent --budget-ms 400 --output imports.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_BUDGET_MS = float(os.environ.get("INVOICE_AGENT_IMPORT_BUDGET_MS", "400"))
+
+# Loaded by the command that needs them, never by importing the agent
+DEFERRED_MODULES = [
+    "langchain", "langchain_core", "langchain_ollama", "pydantic",
+    "pandas", "openpyxl", "pyarrow", "flask", "dateutil",
+    "update_excel", "admin_fn",
+    "xgboost", "sklearn", "matplotlib", "scipy",
+]
+
+def parse_importtime(stderr: str):
+    # Lines look like "import time:       412 |      10250 |   pandas"; nesting is shown by indentation
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        name = name.rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us), "depth": depth})
+    return entries
+
+def run(args):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+        print(f"❌ Importing {args.module} failed")
+        return 1
+
+    entries = parse_importtime(result.stderr)
+    target = next((e for e in reversed(entries) if e["module"] == args.module), None)
+    total_ms = (target["cumulative_us"] if target else sum(e["self_us"] for e in entries)) / 1000
+
+    by_package = defaultdict(int)
+    for entry in entries:
+        by_package[entry["module"].split(".")[0]] += entry["self_us"]
+    slowest = sorted(by_package.items(), key=lambda item: -item[1])[:args.top]
+    imported = {e["module"].split(".")[0] for e in entries}
+    deferred = [name for name in DEFERRED_MODULES if name in imported]
+
+    print(f"Import of {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for package, us in slowest:
+        print(f"  {package:<30} {us / 1000:8.1f} ms")
+    if deferred:
+        print(f"Loaded at import time but should be deferred: {', '.join(deferred)}")
+
+    report = {
+        "module": args.module,
+        "total_ms": round(total_ms, 3),
+        "budget_ms": args.budget_ms,
+        "packages_ms": {package: round(us / 1000, 3) for package, us in sorted(by_package.items(), key=lambda item: -item[1])},
+        "deferred_violations": deferred,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+    if total_ms > args.budget_ms or deferred:
+        print("❌ Import budget exceeded")
+        return 1
+    print("✅ Within import budget")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Check how long importing an agent entry point takes")
+    parser.add_argument("--module", default="src.agent")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=15, help="number of packages to list")
+    parser.add_argument("--output", help="write machine-readable JSON results here")
+    sys.exit(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any
+
+class InterpretationBatcher:
+    """Collects inputs arriving within a short window and hands them to run_batch together, so one prompt interprets them all."""
+
+    def __init__(self, run_batch, window_ms: float=5.0, max_batch_size: int=8, max_concurrent_batches: int=2):
+        # run_batch([(user_input, context), ...]) returns one result per input, in order
+        self.run_batch = run_batch
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+
+        self._queue = queue.Queue()
+        self._executor = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+
+    def _start(self):
+        # The dispatcher thread only starts once something actually reaches the LLM
+        with self._start_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_batches, thread_name_prefix="interpret-batch")
+                threading.Thread(target=self._dispatch_loop, name="interpret-batcher", daemon=True).start()
+
+    def submit(self, user_input: str) -> Future:
+        if self._executor is None:
+            self._start()
+        future = Future()
+        # The caller's context travels with the input so its trace still gets the spans and tokens
+        self._queue.put((user_input, contextvars.copy_context(), future))
+        return future
+
+    def _dispatch_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Light traffic: nothing else is waiting, so don't hold the request back for the window
+            if not self._queue.empty():
+                deadline = time.monotonic() + self.window
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self._queue.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch):
+        with self._stats_lock:
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+
+        try:
+            results = self.run_batch([(user_input, context) for user_input, context, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def batch_report(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["avg_batch_size"] = stats["requests"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
@@ -0,0 +1,169 @@
+import importlib.util
+import json
+import os
+import sys
+import threading
+from typing import TYPE_CHECKING, Dict, List
+
+from .workbook_cache import file_signature
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Checked without importing it; pandas and pyarrow load on the first sync/read
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+DATA_DIR = "data"
+SIDECAR_DIRNAME = ".columnar"
+
+def _normalize(df: "pd.DataFrame") -> "pd.DataFrame":
+    import pandas as pd
+    # Parquet needs string column names and a single type per column; mixed object columns are stored as text
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for col in df.columns:
+        if df[col].dtype == object and df[col].map(type).nunique() > 1:
+            df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+    return df
+
+class ColumnarStore:
+    """Parquet copy of every sheet of data/<service>.xlsx, re-synced lazily whenever the workbook changes."""
+
+    def __init__(self, data_dir: str=DATA_DIR):
+        self.data_dir = data_dir
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def workbook_path(self, service: str) -> str:
+        return os.path.join(self.data_dir, f"{service}.xlsx")
+
+    def sidecar_dir(self, service: str) -> str:
+        return os.path.join(self.data_dir, SIDECAR_DIRNAME, service)
+
+    def _manifest_path(self, service: str) -> str:
+        return os.path.join(self.sidecar_dir(service), "manifest.json")
+
+    def _lock(self, service: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(service, threading.Lock())
+
+    def _load_manifest(self, service: str):
+        try:
+            with open(self._manifest_path(service), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _signature(self, service: str):
+        return [list(s) if s else None for s in file_signature([self.workbook_path(service)])]
+
+    def is_fresh(self, service: str) -> bool:
+        manifest = self._load_manifest(service)
+        return manifest is not None and manifest.get("signature") == self._signature(service)
+
+    def sync(self, service: str, force: bool=False) -> Dict:
+        with self._lock(service):
+            manifest = self._load_manifest(service)
+            signature = self._signature(service)
+            if not force and manifest is not None and manifest.get("signature") == signature:
+                return manifest
+
+            import pandas as pd
+            sheets = pd.read_excel(self.workbook_path(service), sheet_name=None)
+            sidecar_dir = self.sidecar_dir(service)
+            os.makedirs(sidecar_dir, exist_ok=True)
+
+            files = {}
+            for i, (sheet_name, df) in enumerate(sheets.items()):
+                filename = f"{i:03d}.parquet"
+                tmp_path = os.path.join(sidecar_dir, filename + ".tmp")
+                _normalize(df).to_parquet(tmp_path, index=False)
+                os.replace(tmp_path, os.path.join(sidecar_dir, filename))
+                files[sheet_name] = filename
+
+            manifest = {"signature": signature, "sheets": files}
+            tmp_path = self._manifest_path(service) + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(tmp_path, self._manifest_path(service))
+
+            for filename in os.listdir(sidecar_dir):
+                if filename.endswith(".parquet") and filename not in files.values():
+                    os.remove(os.path.join(sidecar_dir, filename))
+            return manifest
+
+    def sheet_names(self, service: str) -> List[str]:
+        return list(self.sync(service)["sheets"].keys())
+
+    def sheet_path(self, service: str, sheet_name: str) -> str:
+        manifest = self.sync(service)
+        if sheet_name not in manifest["sheets"]:
+            raise KeyError(f"Worksheet named '{sheet_name}' not found in {self.workbook_path(service)}")
+        return os.path.join(self.sidecar_dir(service), manifest["sheets"][sheet_name])
+
+    def read_sheet(self, service: str, sheet_name: str, columns=None) -> "pd.DataFrame":
+        import pandas as pd
+        return pd.read_parquet(self.sheet_path(service, sheet_name), columns=columns, memory_map=True)
+
+    def verify(self, service: str) -> List[str]:
+        # Compares every sidecar sheet with the workbook; returns a list of human-readable differences
+        import pandas as pd
+        problems = []
+        manifest = self._load_manifest(service)
+        if manifest is None:
+            return [f"{service}: no columnar copy"]
+        if manifest.get("signature") != self._signature(service):
+            problems.append(f"{service}: workbook changed since last sync")
+
+        sheets = pd.read_excel(self.workbook_path(service), sheet_name=None)
+        if set(sheets) != set(manifest["sheets"]):
+            problems.append(f"{service}: sheets differ (workbook {sorted(sheets)}, columnar {sorted(manifest['sheets'])})")
+
+        for sheet_name in set(sheets) & set(manifest["sheets"]):
+            expected = _normalize(sheets[sheet_name])
+            actual = pd.read_parquet(os.path.join(self.sidecar_dir(service), manifest["sheets"][sheet_name]))
+            try:
+                pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+            except AssertionError as e:
+                problems.append(f"{service}/{sheet_name}: {str(e).splitlines()[0]}")
+        return problems
+
+    def services(self) -> List[str]:
+        return sorted(f[:-5] for f in os.listdir(self.data_dir) if f.endswith(".xlsx") and not f.startswith("~$"))
+
+    def migrate(self, services=None) -> Dict[str, str]:
+        results = {}
+        for service in services or self.services():
+            try:
+                manifest = self.sync(service, force=True)
+                results[service] = f"✅ {len(manifest['sheets'])} sheet(s)"
+            except Exception as e:
+                results[service] = f"❌ {e}"
+        return results
+
+columnar_store = ColumnarStore()
+
+def main(argv):
+    # python -m src.columnar_store migrate|verify [service ...]   (run from the application directory)
+    if not argv or argv[0] not in ("migrate", "verify"):
+        print("Usage: python -m src.columnar_store migrate|verify [service ...]")
+        return 2
+    if not PARQUET_AVAILABLE:
+        print("❌ pyarrow is required for the columnar store")
+        return 1
+
+    services = argv[1:] or columnar_store.services()
+    if argv[0] == "migrate":
+        for service, status in columnar_store.migrate(services).items():
+            print(f"{service}: {status}")
+        return 0
+
+    failed = False
+    for service in services:
+        problems = columnar_store.verify(service)
+        failed = failed or bool(problems)
+        print("\n".join(problems) if problems else f"{service}: ✅ consistent")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+from html import escape
+from typing import Callable, Dict
+
+from .tracing import span
+from .workbook_cache import file_signature
+
+_INPUT_STYLE = "width: 100%; padding: 6px; font-size: 0.85rem;"
+_LABEL_STYLE = "display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;"
+
+# Fixed fields of each form: (title id in titles/<service>.json, element id, field name, input type, extra attributes)
+FORM_SPECS = {
+    'add': {
+        'form_id': 'addCustomerForm',
+        'endpoint': 'add_customer',
+        'heading': 'Add Customer:',
+        'button': 'Add Customer',
+        'fields': [
+            ('fixed_1', 'customerName', 'customer_name', 'text', ''),
+            ('fixed_7', 'category', 'selected_id', 'text', ''),
+            ('fixed_2', 'unitPrice', 'unit_price', 'number', ' step="10"'),
+            ('fixed_3', 'consumptionPeriod', 'consumption_period', 'text', ''),
+            ('fixed_4', 'usagePercent', 'usage_percent', 'text', ' min="0" max="100" step="1"'),
+        ],
+    },
+    'edit': {
+        'form_id': 'editCustomerForm',
+        'endpoint': 'update_customer',
+        'heading': 'Edit Customer:',
+        'button': 'Edit Customer',
+        'fields': [
+            ('fixed_7', 'category', 'category', 'text', ''),
+            ('fixed_2', 'unitPrice', 'cost', 'number', ' step="10"'),
+            ('fixed_3', 'consumptionPeriod', 'period', 'text', ''),
+            ('fixed_4', 'usagePercent', 'usage', 'text', ' min="0" max="100" step="1"'),
+        ],
+    },
+}
+
+def _render_input(label, field_id, name, input_type, extra=''):
+    return (f'    <div style="margin-bottom: 10px;">\n'
+            f'      <label for="{field_id}" style="{_LABEL_STYLE}">{escape(str(label))}</label>\n'
+            f'      <input type="{input_type}" id="{field_id}" name="{name}"{extra} style="{_INPUT_STYLE}" />\n'
+            f'    </div>\n')
+
+class CompiledForm:
+    def __init__(self, spec: Dict, body: str):
+        self.spec = spec
+        self.body = body
+        self.etag = hashlib.sha1(body.encode()).hexdigest()[:16]
+
+    def etag_for(self, service_name: str, customer_name: str=None) -> str:
+        key = f"{self.etag}|{service_name}|{customer_name or ''}"
+        return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+    def render(self, action_url: str, service_name: str, customer_name: str=None) -> str:
+        hidden = f'    <input type="hidden" name="service" value="{escape(service_name)}" />\n'
+        if customer_name is not None:
+            hidden += f'    <input type="hidden" name="customer" value="{escape(customer_name)}" />\n'
+        etag = self.etag_for(service_name, customer_name)
+        return (f'<form id="{self.spec["form_id"]}" method="POST" action="{action_url}" '
+                f'data-etag="{escape(etag)}" style="font-size: 0.85rem;">\n'
+                f'  <div>\n{hidden}{self.body}')
+
+class FormRenderer:
+    """Compiles each service's customer forms once per version of its columns/titles config."""
+
+    def __init__(self, load_columns: Callable, load_titles: Callable):
+        self.load_columns = load_columns
+        self.load_titles = load_titles
+        self._compiled = {}   # (kind, service) -> (signature, CompiledForm)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _config_paths(service_name):
+        return [os.path.join("columns", f"{service_name}.json"), os.path.join("titles", f"{service_name}.json")]
+
+    def compiled(self, kind: str, service_name: str) -> CompiledForm:
+        signature = file_signature(self._config_paths(service_name))
+        key = (kind, service_name)
+        with self._lock:
+            entry = self._compiled.get(key)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        form = self._compile(kind, service_name)
+        with self._lock:
+            self._compiled[key] = (signature, form)
+        return form
+
+    def _compile(self, kind: str, service_name: str) -> CompiledForm:
+        spec = FORM_SPECS[kind]
+        columns = self.load_columns(service_name)
+        titles = {t["id"]: t["title"] for t in self.load_titles(service_name)}
+
+        parts = [f'    <p style="margin-bottom: 8px; font-weight: bold;">{spec["heading"]}</p>\n']
+        for title_id, field_id, name, input_type, extra in spec['fields']:
+            parts.append(_render_input(titles.get(title_id), field_id, name, input_type, extra))
+        for col in columns:
+            field_id = col["title"].lower().replace(" ", "_")
+            parts.append(_render_input(col["title"], field_id, field_id, col.get("type", "text")))
+        parts.append(f'    <button type="submit" style="font-size: 0.85rem; padding: 6px 12px;">{spec["button"]}</button>\n')
+        parts.append('  </div>\n</form>')
+        return CompiledForm(spec, "".join(parts))
+
+    def render(self, kind: str, action_url: str, service_name: str, customer_name: str=None) -> str:
+        with span("render", form=kind):
+            return self.compiled(kind, service_name).render(action_url, service_name, customer_name)
+
+    def etag(self, kind: str, service_name: str, customer_name: str=None) -> str:
+        return self.compiled(kind, service_name).etag_for(service_name, customer_name)
+
+    def invalidate(self, service_name: str=None):
+        with self._lock:
+            for key in [k for k in self._compiled if service_name is None or k[1] == service_name]:
+                del self._compiled[key]
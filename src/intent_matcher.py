@@ -0,0 +1,145 @@
+import re
+import threading
+from typing import Dict, Any, Optional, Iterable, List
+
+# Words that qualify a request rather than name something ("... for Cloud this month")
+_QUALIFIER = r"(?:and|then|this|last|previous|current|month|months|please|thanks)"
+# A name never starts with a preposition or contains a qualifier, so "add service for Cloud" or
+# "show current invoice for Cloud for last month" go to the LLM instead of binding "for Cloud" or "Cloud for last month"
+_NAME = rf"(?!(?:for|to|from)\b)(?!{_QUALIFIER}\b)[\w&\-]+(?: (?!{_QUALIFIER}\b)[\w&\-]+)*?"
+_PERCENT = r"\d+(?:\.\d+)?\s*%?"
+_SHOW = r"(?:show|view|display|get|open|see)(?: me)?(?: the| its)?"   # "its" is a follow-up, bound from the session
+_MONTHS = r"(?: month(?:'?s)?)?"
+_MONTH_NAME = r"(?:january|february|march|april|may|june|july|august|september|october|november|december)"
+
+SAME_TAX_PATTERN = rf"(?:apply|use|set)(?: the)? same tax(?: rates?)? (?:to|for|on) (?P<service_name>{_NAME})"
+
+# Fixed phrasings for each command in function_map. Anything that doesn't match falls back to the LLM.
+# Phrasings without a service are follow-ups; the agent binds the service from the session context.
+COMMAND_PATTERNS = {
+    'list_services': [
+        rf"(?:list|{_SHOW})(?: all)?(?: the)?(?: available)? services",
+        r"what services (?:are there|do we have|are available)",
+    ],
+    'list_customers': [
+        rf"(?:list|{_SHOW})(?: all)?(?: the)? customers (?:for|of|in|under) (?:service )?(?P<service_name>{_NAME})(?: service)?",
+        rf"who are the customers (?:for|of|in) (?P<service_name>{_NAME})",
+        rf"(?:list|{_SHOW})(?: all)?(?: the)? customers",
+    ],
+    'view_current_invoice': [
+        rf"{_SHOW} (?:current|this){_MONTHS} invoice (?:for|of) (?P<service_name>{_NAME})(?: (?:for )?this month)?",
+        rf"{_SHOW} invoice (?:for|of) (?P<service_name>{_NAME}) (?:for )?this month",
+        rf"{_SHOW} (?:current|this){_MONTHS} invoice",
+    ],
+    'view_last_invoice': [
+        rf"{_SHOW} (?:last|previous){_MONTHS} invoice (?:for|of) (?P<service_name>{_NAME})(?: (?:for )?(?:last|previous) month)?",
+        rf"{_SHOW} invoice (?:for|of) (?P<service_name>{_NAME}) (?:for )?(?:last|previous) month",
+        rf"{_SHOW} (?:last|previous){_MONTHS} invoice",
+    ],
+    'copy_previous_data': [
+        rf"copy(?: the)? (?:previous|last){_MONTHS} data (?:for|of|to) (?P<service_name>{_NAME})",
+        rf"copy(?: the)? (?:previous|last){_MONTHS} data",
+    ],
+    'add_service': [
+        rf"(?:add|create)(?: a)?(?: new)? service(?: called| named)? (?P<service_name>{_NAME})",
+    ],
+    'add_customer': [
+        rf"(?:add|create)(?: a)?(?: new)? customer (?:to|for|in|under) (?P<service_name>{_NAME})",
+        rf"(?:add|create)(?: a)?(?: new)? customer",
+    ],
+    'edit_customer': [
+        rf"(?:edit|modify|change)(?: the)? customer (?P<customer_name>{_NAME}) (?:in|for|of|under) (?P<service_name>{_NAME})",
+        r"(?:edit|modify|change)(?: the)?(?: same)? customer(?: again)?",
+        rf"(?:edit|modify|change)(?: the)? customer (?P<customer_name>{_NAME})",
+    ],
+    'view_sheet': [
+        rf"{_SHOW}(?: raw)? (?P<sheet_name>{_MONTH_NAME}) (?:sheet|data) (?:for|of) (?P<service_name>{_NAME})",
+        rf"{_SHOW}(?: raw)? (?:sheet|data|sheet data) (?:for|of) (?P<service_name>{_NAME})(?: (?:for|in) (?P<sheet_name>{_MONTH_NAME}))?",
+        rf"{_SHOW}(?: raw)? (?P<sheet_name>{_MONTH_NAME}) (?:sheet|data)",
+    ],
+    'show_more': [
+        r"show more (?P<cursor>[A-Za-z0-9_\-]+)",
+    ],
+    'job_status': [
+        r"(?:job status|status of job|check job|check on job|how is job) (?P<job_id>[0-9a-f]{8})",
+    ],
+    'update_tax': [
+        rf"(?:update|set|change)(?: the)? tax(?: rates?)? (?:for|of) (?P<service_name>{_NAME}) (?:to )?cgst (?P<cgst>{_PERCENT})(?:,| and)? sgst (?P<sgst>{_PERCENT})",
+        SAME_TAX_PATTERN,
+    ],
+}
+
+# Phrasings that refer back to earlier values set a flag on the match, so the session fills only what was asked for
+PATTERN_FLAGS = {
+    SAME_TAX_PATTERN: {"reuse_tax_rates": True},
+}
+
+_VERBS = r"(?:list|show|view|display|get|open|see|copy|add|create|edit|modify|change|update|set|who|what)"
+# Splits "list customers for Cloud and show current invoice for Cloud" into its commands
+STEP_SEPARATOR = re.compile(rf"\s*(?:;|,?\s+(?:and\s+)?then\s+|,?\s+and\s+(?={_VERBS}\b)|,\s*(?={_VERBS}\b))\s*", re.IGNORECASE)
+
+def looks_compound(user_input: str) -> bool:
+    # Only a separator makes a request multi-step; pronouns in a single command are bound from the session context
+    return len(STEP_SEPARATOR.split(user_input.strip())) > 1
+
+class IntentMatcher:
+    def __init__(self, commands: Iterable[str]):
+        self.patterns = [
+            (command, re.compile(rf"^{pattern}$", re.IGNORECASE), PATTERN_FLAGS.get(pattern, {}))
+            for command in commands
+            for pattern in COMMAND_PATTERNS.get(command, [])
+        ]
+        self.stats = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = re.sub(r"\s+", " ", text.strip())
+        return re.sub(r"^(?:please |can you |could you |now |ok |okay |and )+|(?:\s+(?:please|thanks|thank you)|[\s.!?,])+$", "", text, flags=re.IGNORECASE)
+
+    def _match_text(self, text: str) -> Optional[Dict[str, Any]]:
+        for command, pattern, flags in self.patterns:
+            m = pattern.match(text)
+            if m:
+                parameters = {k: v.strip() for k, v in m.groupdict().items() if v}
+                return dict({
+                    "command": command,
+                    "confidence": 1.0,
+                    "parameters": parameters,
+                    "source": "fast_path"
+                }, **flags)
+        return None
+
+    def match(self, user_input: str) -> Optional[Dict[str, Any]]:
+        matched = self._match_text(self.normalize(user_input))
+        self._count("hits" if matched else "misses")
+        return matched
+
+    def match_plan(self, user_input: str) -> Optional[List[Dict[str, Any]]]:
+        # Only succeeds when every part of a compound request is a fixed phrasing
+        parts = [p for p in STEP_SEPARATOR.split(user_input.strip()) if p]
+        if len(parts) < 2:
+            return None
+        steps = []
+        for part in parts:
+            step = self._match_text(self.normalize(part))
+            if step is None:
+                self._count("misses")
+                return None
+            steps.append(step)
+        self._count("hits")
+        return steps
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def hit_rate(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            hits, misses = self.stats["hits"], self.stats["misses"]
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0
+        }
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+CACHE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'interpretation_cache.json'))
+
+class InterpretationCache:
+    def __init__(self, path: str=CACHE_PATH, max_entries: int=1024, ttl: float=7 * 24 * 3600,
+                 min_confidence: float=0.8, save_every: int=20):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_confidence = min_confidence
+        self.save_every = save_every
+
+        self._entries = OrderedDict()   # key -> (stored_at, interpretation)
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "rejected": 0}
+        self.load()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        text = re.sub(r"[^\w\s%.]|(?<!\d)\.|\.(?!\d)", " ", text.lower())
+        return re.sub(r"\s+", " ", text).strip()
+
+    def get(self, user_input: str) -> Optional[Dict[str, Any]]:
+        key = self.normalize(user_input)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            stored_at, interpretation = entry
+            if time.time() - stored_at > self.ttl:
+                del self._entries[key]
+                self.stats["expired"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return dict(interpretation, parameters=dict(interpretation.get("parameters", {})))
+
+    def put(self, user_input: str, interpretation: Dict[str, Any]):
+        if not self._cacheable(interpretation):
+            with self._lock:
+                self.stats["rejected"] += 1
+            return
+
+        key = self.normalize(user_input)
+        with self._lock:
+            self._entries[key] = (time.time(), interpretation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evicted"] += 1
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+
+        if should_save:
+            self.save()
+
+    def _cacheable(self, interpretation: Dict[str, Any]) -> bool:
+        if not isinstance(interpretation, dict) or "error" in interpretation:
+            return False
+        if interpretation.get("command", "unknown") == "unknown":
+            return False
+        try:
+            return float(interpretation.get("confidence", 0.0)) >= self.min_confidence
+        except (TypeError, ValueError):
+            return False
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r') as f:
+                stored = json.load(f)
+        except Exception as e:
+            print(f"Ignoring unreadable interpretation cache {self.path}: {e}")
+            return
+
+        now = time.time()
+        with self._lock:
+            for key, stored_at, interpretation in stored:
+                if now - stored_at <= self.ttl and self._cacheable(interpretation):
+                    self._entries[key] = (stored_at, interpretation)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        with self._lock:
+            stored = [[key, stored_at, interpretation] for key, (stored_at, interpretation) in self._entries.items()]
+            self._unsaved = 0
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Failed to save interpretation cache: {e}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._unsaved = 0
+
+    def hit_rate(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, size=len(self._entries))
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
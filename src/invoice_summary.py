@@ -0,0 +1,325 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .workbook_cache import file_signature
+
+AMOUNT_TOLERANCE = 0.005
+
+def month_key(action: str, now: datetime=None) -> str:
+    # 'generate' is the current month's invoice, 'view' the previous month's
+    now = now or datetime.now()
+    if action == 'view':
+        year, month = (now.year, now.month - 1) if now.month > 1 else (now.year - 1, 12)
+        return f"{year:04d}-{month:02d}"
+    return now.strftime("%Y-%m")
+
+def _number(value) -> float:
+    if value is None:
+        return 0.0
+    if isinstance(value, str):
+        value = value.strip().replace('%', '').replace(',', '')
+        if not value:
+            return 0.0
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if number != number else number   # NaN from empty cells
+
+def line_amount(unit_price, usage_percent) -> float:
+    return _number(unit_price) * _number(usage_percent) / 100
+
+TOTAL_LABELS = {"total", "totals", "subtotal", "sub total", "grand total"}
+
+def is_total_label(customer) -> bool:
+    # Some invoices end with their own totals row; it is not a customer
+    return str(customer).strip().lower() in TOTAL_LABELS
+
+class InvoiceSummary:
+    """Per-customer invoice lines of one service and month, with running CGST/SGST and grand totals.
+
+    Each line keeps the invoice row it was built from, so views show the invoice's real columns. A line changed
+    by a delta (or every line, after a rate change) has its amount and tax columns recomputed on read.
+    """
+
+    def __init__(self, cgst_rate: float=0.0, sgst_rate: float=0.0):
+        self.cgst_rate = cgst_rate
+        self.sgst_rate = sgst_rate
+        self.lines = OrderedDict()   # customer -> amount
+        self.records = {}            # customer -> invoice row as {column title: value}
+        self.columns = None          # column titles of the invoice the summary was built from
+        self.stale = set()           # customers whose record no longer matches their amount
+        self.rates_changed = False
+        self.subtotal = 0.0
+        self.raw_rows = []           # the invoice rows as computed, when no customer column could be identified
+
+    def size(self) -> int:
+        return len(self.lines) or len(self.raw_rows)
+
+    def add_record(self, customer: str, amount: float, record: Dict[str, Any]):
+        if customer in self.lines:
+            # The same customer on several rows is shown as one line with the combined amount
+            self.set_line(customer, self.lines[customer] + amount)
+            return
+        self.lines[customer] = amount
+        self.records[customer] = record
+        self.subtotal += amount
+
+    def set_line(self, customer: str, amount: float, fields: Dict[str, Any]=None):
+        self.subtotal += amount - self.lines.get(customer, 0.0)
+        self.lines[customer] = amount
+        self.records.setdefault(customer, {}).update(fields or {})
+        self.stale.add(customer)
+
+    def remove_line(self, customer: str):
+        self.subtotal -= self.lines.pop(customer, 0.0)
+        self.records.pop(customer, None)
+        self.stale.discard(customer)
+
+    def set_rates(self, cgst_rate: float, sgst_rate: float):
+        # Line taxes are derived from the amounts on read, so a rate change is O(1)
+        if (cgst_rate, sgst_rate) != (self.cgst_rate, self.sgst_rate):
+            self.cgst_rate = cgst_rate
+            self.sgst_rate = sgst_rate
+            self.rates_changed = True
+
+    def copy(self) -> "InvoiceSummary":
+        summary = InvoiceSummary(self.cgst_rate, self.sgst_rate)
+        summary.lines = OrderedDict(self.lines)
+        summary.records = {customer: dict(record) for customer, record in self.records.items()}
+        summary.columns = list(self.columns) if self.columns else None
+        summary.stale = set(self.stale)
+        summary.rates_changed = self.rates_changed
+        summary.subtotal = self.subtotal
+        summary.raw_rows = [dict(row) for row in self.raw_rows]
+        return summary
+
+    def totals(self) -> Dict[str, float]:
+        cgst = self.subtotal * self.cgst_rate
+        sgst = self.subtotal * self.sgst_rate
+        return {"amount": self.subtotal, "cgst": cgst, "sgst": sgst, "total": self.subtotal + cgst + sgst}
+
+    def rows(self, offset: int=0, limit: int=None) -> List[Dict[str, Any]]:
+        customers = list(self.lines.items())[offset:None if limit is None else offset + limit]
+        rows = []
+        for customer, amount in customers:
+            cgst = amount * self.cgst_rate
+            sgst = amount * self.sgst_rate
+            rows.append({"customer": customer, "amount": amount, "cgst": cgst, "sgst": sgst, "total": amount + cgst + sgst,
+                         "record": self.records.get(customer, {}),
+                         "fresh": customer not in self.stale and not self.rates_changed})
+        return rows
+
+    def differences(self, other: "InvoiceSummary") -> List[str]:
+        problems = []
+        if abs(self.cgst_rate - other.cgst_rate) > 1e-9 or abs(self.sgst_rate - other.sgst_rate) > 1e-9:
+            problems.append(f"tax rates {self.cgst_rate}/{self.sgst_rate} != {other.cgst_rate}/{other.sgst_rate}")
+        for customer in set(self.lines) | set(other.lines):
+            ours, theirs = self.lines.get(customer), other.lines.get(customer)
+            if ours is None or theirs is None or abs(ours - theirs) > AMOUNT_TOLERANCE:
+                problems.append(f"{customer}: {ours} != {theirs}")
+        return problems
+
+class InvoiceSummaries:
+    """Materialized invoices per (service, month), kept current by the write paths.
+
+    Writes whose effect is known exactly (tax rates, removed customers) are applied as deltas. Writes the invoice
+    function may compute differently (saved customers, a seeded month) rebuild the summary in the background,
+    and reads of it wait for that instead of seeing a guess. Otherwise a summary is rebuilt only when it is
+    missing, when the workbook changed behind our back (e.g. edited in Excel), or when verify() finds a difference.
+    """
+
+    def __init__(self, load_invoice: Callable, load_titles: Callable, load_tax: Callable, data_dir: str="data"):
+        self.load_invoice = load_invoice    # (action, service) -> invoice DataFrame
+        self.load_titles = load_titles      # service -> [{"id": "fixed_1", "title": ...}, ...]
+        self.load_tax = load_tax            # service -> {"cgst": ..., "sgst": ...}
+        self.data_dir = data_dir
+        self._summaries = {}                # (service, month) -> (workbook signature, InvoiceSummary)
+        self._refreshing = {}               # (service, month) -> Future of a rebuild started by a write
+        self._refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="invoice-refresh")
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "rebuilds": 0, "deltas": 0, "refreshes": 0, "verify_mismatches": 0}
+
+    def _signature(self, service: str):
+        return file_signature([os.path.join(self.data_dir, f"{service}.xlsx")])
+
+    def columns(self, service: str):
+        # (customer, amount, unit price, usage %, total) column titles of the service's sheets
+        titles = {t["id"]: t["title"] for t in self.load_titles(service) or []}
+        return (titles.get("fixed_1", "Customer Name"), titles.get("fixed_5", "Amount"),
+                titles.get("fixed_2", "Unit Price"), titles.get("fixed_4", "Usage %"), titles.get("fixed_6", "Total"))
+
+    def _rates(self, service: str):
+        tax = self.load_tax(service) or {}
+        return _number(tax.get("cgst")), _number(tax.get("sgst"))
+
+    def rebuild(self, service: str, action: str) -> InvoiceSummary:
+        signature = self._signature(service)
+        df = self.load_invoice(action, service)
+        summary = InvoiceSummary(*self._rates(service))
+
+        customer_col, amount_col, price_col, usage_col, _ = self.columns(service)
+        if df is not None and not df.empty:
+            summary.columns = [str(c) for c in df.columns]
+            records = [{str(k): v for k, v in row.items()} for row in df.to_dict("records")]
+        else:
+            records = []
+        if records and customer_col not in summary.columns:
+            # Without the customer column there are no lines to maintain; the invoice is shown as computed
+            print(f"⚠️ No '{customer_col}' column in the {service} invoice; showing it without a summary")
+            summary.raw_rows = records
+            records = []
+        for record in records:
+            customer = record.get(customer_col)
+            if customer is None or customer != customer or is_total_label(customer):
+                continue
+            if amount_col in record:
+                amount = _number(record[amount_col])
+            else:
+                amount = line_amount(record.get(price_col), record.get(usage_col))
+            summary.add_record(str(customer), amount, record)
+
+        with self._lock:
+            self._summaries[(service, month_key(action))] = (signature, summary)
+            self.stats["rebuilds"] += 1
+        return summary
+
+    def get(self, service: str, action: str) -> InvoiceSummary:
+        # Callers must treat the summary as read-only. Tax rates live outside the workbook (and can change
+        # without update_tax_rates), so they are re-read on every hit; applying them is O(1).
+        key = (service, month_key(action))
+        with self._lock:
+            pending = self._refreshing.get(key)
+        if pending is not None:
+            try:
+                pending.result()
+            except Exception:
+                pass    # Rebuilt below instead
+        with self._lock:
+            entry = self._summaries.get(key)
+            if entry is None or entry[0] != self._signature(service):
+                entry = None
+            else:
+                self.stats["hits"] += 1
+        if entry is None:
+            return self.rebuild(service, action)
+        rates = self._rates(service)
+        with self._lock:
+            entry[1].set_rates(*rates)
+        return entry[1]
+
+    def display_page(self, service: str, summary: InvoiceSummary, offset: int, limit: int, with_totals: bool):
+        """Returns (columns, rows) of one page in the invoice's own column layout, plus the grand totals row if asked."""
+        if summary.raw_rows:
+            return list(summary.columns), [dict(row) for row in summary.raw_rows[offset:offset + limit]]
+
+        customer_col, amount_col, _, _, total_col = self.columns(service)
+        columns = list(summary.columns or [customer_col])
+        cgst_col = next((c for c in columns if "cgst" in c.lower()), f"CGST ({summary.cgst_rate * 100:g}%)")
+        sgst_col = next((c for c in columns if "sgst" in c.lower()), f"SGST ({summary.sgst_rate * 100:g}%)")
+        for column in (amount_col, cgst_col, sgst_col, total_col):
+            if column not in columns:
+                columns.append(column)
+
+        rows = []
+        for line in summary.rows(offset, limit):
+            row = dict.fromkeys(columns)
+            row.update(line["record"])
+            row[customer_col] = line["customer"]
+            computed = {amount_col: line["amount"], cgst_col: line["cgst"], sgst_col: line["sgst"], total_col: line["total"]}
+            for column, value in computed.items():
+                # Untouched rows show the invoice's own figures; anything a delta changed is recomputed
+                if not line["fresh"] or line["record"].get(column) is None:
+                    row[column] = round(value, 2)
+            rows.append(row)
+
+        if with_totals:
+            totals = summary.totals()
+            row = dict.fromkeys(columns, "")
+            row.update({customer_col: "Grand Total", amount_col: round(totals["amount"], 2), cgst_col: round(totals["cgst"], 2),
+                        sgst_col: round(totals["sgst"], 2), total_col: round(totals["total"], 2)})
+            rows.append(row)
+        return columns, rows
+
+    def _restamp(self, service: str):
+        # The caller's write is fully covered by its delta or refresh, so the service's other summaries stay valid
+        signature = self._signature(service)
+        for key, (_, summary) in list(self._summaries.items()):
+            if key[0] == service:
+                self._summaries[key] = (signature, summary)
+
+    def _current(self, service: str, action: str) -> Optional[InvoiceSummary]:
+        entry = self._summaries.get((service, month_key(action)))
+        return entry[1] if entry is not None else None
+
+    def refresh(self, service: str, action: str='generate'):
+        """Rebuilds one summary on the refresh worker; get() waits for it rather than serving the old one."""
+        key = (service, month_key(action))
+        with self._lock:
+            self._summaries.pop(key, None)
+            future = self._refresh_executor.submit(self.rebuild, service, action)
+            self._refreshing[key] = future
+            self.stats["refreshes"] += 1
+        future.add_done_callback(lambda done: self._refreshed(key, done))
+
+    def _refreshed(self, key, future):
+        with self._lock:
+            if self._refreshing.get(key) is future:
+                del self._refreshing[key]
+
+    def customer_saved(self, service: str, action: str='generate'):
+        # Call after a customer row is added or edited. The line comes from the invoice function, which
+        # may not be a plain price x usage, so it is recomputed rather than patched.
+        self.refresh(service, action)
+        with self._lock:
+            self._restamp(service)
+
+    def customer_removed(self, service: str, customer: str, action: str='generate'):
+        with self._lock:
+            summary = self._current(service, action)
+            if summary is not None:
+                summary.remove_line(str(customer))
+                self.stats["deltas"] += 1
+            self._restamp(service)
+
+    def tax_updated(self, service: str, cgst_rate: float, sgst_rate: float):
+        # Rates apply to every month's summary of the service; the workbook itself isn't touched
+        with self._lock:
+            for key, (_, summary) in self._summaries.items():
+                if key[0] == service:
+                    summary.set_rates(cgst_rate, sgst_rate)
+            self.stats["deltas"] += 1
+
+    def month_seeded(self, service: str):
+        # copy_previous: the current month's sheet is new and is recomputed rather than assumed to be a copy.
+        # Copying only adds that sheet, so last month's summary is still valid even though the file changed.
+        self.refresh(service, 'generate')
+        with self._lock:
+            self._restamp(service)
+
+    def verify(self, service: str, action: str='generate') -> List[str]:
+        """Compares the materialized summary with a full rebuild; the rebuilt one replaces it on any difference."""
+        with self._lock:
+            entry = self._summaries.get((service, month_key(action)))
+        if entry is None:
+            return []
+        rebuilt = self.rebuild(service, action)
+        problems = entry[1].differences(rebuilt)
+        if problems:
+            with self._lock:
+                self.stats["verify_mismatches"] += 1
+            print(f"⚠️ Invoice summary for {service} ({month_key(action)}) was out of date: {problems[:5]}")
+        return problems
+
+    def invalidate(self, service: str=None):
+        with self._lock:
+            for key in [k for k in self._summaries if service is None or k[0] == service]:
+                del self._summaries[key]
+
+    def summary_report(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, summaries=len(self._summaries))
@@ -0,0 +1,161 @@
+import contextvars
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+class ReadWriteLock:
+    """Many readers or one writer. Waiting writers block new readers so a long read stream can't starve them."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+_service_locks = {}
+_service_locks_guard = threading.Lock()
+
+def service_lock(service_name: Optional[str]) -> ReadWriteLock:
+    # Commands without a service (e.g. list_services) share one lock
+    key = (service_name or "").lower()
+    with _service_locks_guard:
+        lock = _service_locks.get(key)
+        if lock is None:
+            lock = _service_locks[key] = ReadWriteLock()
+        return lock
+
+def is_error_result(result) -> bool:
+    # Tools report most failures by returning a "❌ ..." message (or an {"error": ...} dict) rather than raising
+    if isinstance(result, dict):
+        return "error" in result
+    if not isinstance(result, str):
+        return False
+    text = result.lstrip()
+    if text.startswith("<p>"):
+        text = text[3:].lstrip()
+    return text.startswith(("❌", "Error"))
+
+_current_job = threading.local()
+
+def report_progress(progress: float, note: str=None):
+    # Tools running inside a job can call this to update what job_status shows; outside a job it does nothing
+    job = getattr(_current_job, "job", None)
+    if job is not None:
+        job["progress"] = max(0.0, min(1.0, progress))
+        if note:
+            job["note"] = note
+
+class JobQueue:
+    """Runs heavy write commands on a small worker pool, each holding its service's write lock."""
+
+    def __init__(self, workers: int=2, max_jobs: int=500):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invoice-job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def submit(self, command: str, service_name: Optional[str], func: Callable, call_args: Dict[str, Any],
+               on_done: Callable[[], None]=None) -> str:
+        job_id = uuid.uuid4().hex[:8]
+        job = {
+            "id": job_id,
+            "command": command,
+            "service": service_name,
+            "status": "queued",
+            "progress": 0.0,
+            "note": None,
+            "result": None,
+            "error": None,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.max_jobs:
+                oldest = next(iter(self._jobs.values()))
+                if oldest["status"] in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+
+        ctx = contextvars.copy_context()
+        self._executor.submit(ctx.run, self._run, job, func, call_args, on_done)
+        return job_id
+
+    def _run(self, job, func, call_args, on_done):
+        with service_lock(job["service"]).write():
+            job["status"] = "running"
+            job["started_at"] = time.time()
+            _current_job.job = job
+            try:
+                job["result"] = func(**call_args)
+                if is_error_result(job["result"]):
+                    job["error"] = job["result"]
+                    job["status"] = "failed"
+                else:
+                    job["status"] = "done"
+                # A tool that returned an error may still have written part of its files
+                if on_done:
+                    on_done()
+            except Exception as e:
+                job["error"] = str(e)
+                job["status"] = "failed"
+            finally:
+                _current_job.job = None
+                job["progress"] = 1.0
+                job["finished_at"] = time.time()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+job_queue = JobQueue()
+
+def job_status(job_id: str) -> str:
+    job = job_queue.get(job_id.strip().lower())
+    if job is None:
+        return f"❌ No job found with id {job_id}."
+
+    label = f"<strong>{job['command']}</strong>" + (f" for <strong>{job['service']}</strong>" if job["service"] else "")
+    if job["status"] == "queued":
+        return f"⏳ Job {job['id']} ({label}) is waiting to start."
+    if job["status"] == "running":
+        note = f" – {job['note']}" if job["note"] else ""
+        return f"🔄 Job {job['id']} ({label}) is running: {job['progress'] * 100:.0f}%{note}"
+    if job["status"] == "failed":
+        return f"❌ Job {job['id']} ({label}) failed: {job['error']}"
+    return f"✅ Job {job['id']} ({label}) finished in {job['finished_at'] - job['started_at']:.1f}s.<br>{job['result']}"
@@ -0,0 +1,43 @@
+import json
+from typing import Dict, Any
+from langchain_ollama import OllamaLLM as Ollama
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+from langchain.output_parsers import PydanticOutputParser
+from pydantic import BaseModel
+
+from .tracing import span
+
+# langchain and pydantic live here so that importing src.agent stays cheap; CommandInterpreter
+# imports this module the first time a request actually needs the LLM
+
+class CommandOutput(BaseModel):
+    command: str
+    confidence: float
+    parameters: Dict[str, str]
+
+parser = PydanticOutputParser(pydantic_object=CommandOutput)
+
+class CommandParser(BaseOutputParser):
+    def parse(self, text:str) -> Dict[str, Any]:
+        with span("parse"):
+            return self._parse(text)
+
+    def _parse(self, text:str) -> Dict[str, Any]:
+        try:
+            if text.strip().startswith('{'):
+                return json.loads(text.strip())
+
+            # Fallback: extract command and action from text
+            lines = text.strip().split('\n')
+            result = {}
+
+            for line in lines:
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    result[key.strip().lower()] = value.strip().strip('"')
+
+            return result
+        except:
+            return {"command": "unknown", "action": "none"}
@@ -0,0 +1,132 @@
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from .workbook_cache import file_signature
+
+def normalize_name(name: str) -> str:
+    # "Cloud Hosting", "cloud-hosting" and "CloudHosting" all normalize to "cloudhosting"
+    return re.sub(r"[^0-9a-z]", "", str(name).lower())
+
+def _trigrams(key: str):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, limit: int=None) -> int:
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class _NameSet:
+    def __init__(self, names: List[str]):
+        self.exact = {}
+        self.postings = defaultdict(set)
+        for name in names:
+            key = normalize_name(name)
+            if not key:
+                continue
+            self.exact.setdefault(key, name)
+            for gram in _trigrams(key):
+                self.postings[gram].add(key)
+
+    def resolve(self, query: str, limit: int=3, min_score: float=0.4):
+        key = normalize_name(query)
+        if key in self.exact:
+            return self.exact[key], []
+
+        grams = _trigrams(key)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for candidate in self.postings.get(gram, ()):
+                overlap[candidate] += 1
+
+        scored = []
+        for candidate, shared in overlap.items():
+            jaccard = shared / (len(grams) + len(_trigrams(candidate)) - shared)
+            distance = edit_distance(key, candidate, limit=max(len(key), len(candidate)))
+            similarity = 1 - distance / max(len(key), len(candidate))
+            score = 0.3 * jaccard + 0.7 * similarity
+            if score >= min_score:
+                scored.append((score, self.exact[candidate]))
+        scored.sort(key=lambda s: -s[0])
+
+        # A single clear winner is accepted; otherwise the caller gets ranked suggestions
+        if scored and scored[0][0] >= 0.7 and (len(scored) == 1 or scored[0][0] - scored[1][0] >= 0.1):
+            return scored[0][1], []
+        return None, [name for _, name in scored[:limit]]
+
+class NameIndex:
+    """Services and per-service customers, rebuilt whenever the data/ directory or a workbook changes."""
+
+    def __init__(self, load_services: Callable[[], List[str]], load_customers: Callable[[str], List[str]], data_dir: str="data"):
+        self.load_services = load_services
+        self.load_customers = load_customers
+        self.data_dir = data_dir
+        self._services = None   # (signature, _NameSet)
+        self._customers = {}    # service -> (signature, _NameSet)
+        self._lock = threading.Lock()
+
+    def _service_set(self) -> _NameSet:
+        signature = file_signature([self.data_dir])
+        with self._lock:
+            if self._services and self._services[0] == signature:
+                return self._services[1]
+        names = _NameSet(list(self.load_services() or []))
+        with self._lock:
+            self._services = (signature, names)
+        return names
+
+    def _customer_set(self, service_name: str) -> _NameSet:
+        signature = file_signature([os.path.join(self.data_dir, f"{service_name}.xlsx")])
+        with self._lock:
+            entry = self._customers.get(service_name)
+            if entry and entry[0] == signature:
+                return entry[1]
+        names = _NameSet([str(c) for c in self.load_customers(service_name) or []])
+        with self._lock:
+            self._customers[service_name] = (signature, names)
+        return names
+
+    def resolve_service(self, query: str):
+        """Returns (canonical name or None, suggestions)."""
+        return self._service_set().resolve(query)
+
+    def resolve_customer(self, service_name: str, query: str):
+        return self._customer_set(service_name).resolve(query)
+
+    def invalidate(self, service_name: Optional[str]=None):
+        with self._lock:
+            self._services = None
+            if service_name is None:
+                self._customers.clear()
+            else:
+                self._customers.pop(service_name, None)
+
+    def resolve_parameters(self, command: str, call_args: Dict[str, str]):
+        """Rewrites service_name/customer_name to canonical names. Returns an error message if one can't be resolved."""
+        service = call_args.get("service_name")
+        if service and command != 'add_service':
+            canonical, suggestions = self.resolve_service(service)
+            if canonical is None:
+                hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+                return f"I couldn't find a service named '{service}'.{hint}"
+            call_args["service_name"] = canonical
+
+        customer = call_args.get("customer_name")
+        if customer and call_args.get("service_name"):
+            canonical, suggestions = self.resolve_customer(call_args["service_name"], customer)
+            if canonical is None:
+                hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+                return f"I couldn't find a customer named '{customer}' in {call_args['service_name']}.{hint}"
+            call_args["customer_name"] = canonical
+        return None
@@ -0,0 +1,61 @@
+import base64
+import json
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from .tracing import span
+from .workbook_cache import file_signature
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    raw = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[Dict[str, Any]]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return None
+
+def source_signature(path: str):
+    signature = file_signature([path])[0]
+    return list(signature) if signature else None
+
+def read_xlsx_rows(path: str, sheet_name: str, offset: int, limit: int):
+    # Streams the sheet with openpyxl's read-only reader; only the header and the requested rows are kept.
+    # Returns (page DataFrame, has_more).
+    import pandas as pd
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame(), False
+        page = list(islice(rows, offset, offset + limit + 1))
+    finally:
+        workbook.close()
+
+    has_more = len(page) > limit
+    columns = [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(header)]
+    return pd.DataFrame(page[:limit], columns=columns), has_more
+
+def read_parquet_rows(path: str, offset: int, limit: int):
+    import pyarrow.parquet as pq
+    table = pq.read_table(path, memory_map=True)
+    page = table.slice(offset, limit).to_pandas()
+    return page, offset + limit < table.num_rows
+
+def render_page(title: str, page: "pd.DataFrame", next_cursor: Optional[str]) -> str:
+    with span("render", rows=len(page)):
+        return _render_page(title, page, next_cursor)
+
+def _render_page(title: str, page: "pd.DataFrame", next_cursor: Optional[str]) -> str:
+    table_html = page.to_html(index=False, classes="chatbot-invoice-table", border=1)
+    html = f"<b>{title}</b><br><br>{table_html}"
+    if next_cursor:
+        html += f'<br><button class="chatbot-show-more" data-prompt="show more {next_cursor}">Show more</button>'
+    return html
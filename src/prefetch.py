@@ -0,0 +1,168 @@
+import os
+import sys
+import threading
+import time
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+from .jobs import is_error_result, service_lock
+from .session_context import MAX_SESSIONS, current_session
+
+# Commands whose result only depends on the service and the files on disk, so they are safe to run ahead of time
+PREFETCHABLE_COMMANDS = ('view_current_invoice', 'view_last_invoice', 'list_customers', 'list_services', 'add_customer')
+
+def _source_mtime(command: str, service_name: Optional[str]):
+    # The prefetched result is only served while the files it was built from are unchanged
+    if command == 'list_services' or not service_name:
+        paths = ["data"]
+    elif command == 'add_customer':
+        paths = [os.path.join("columns", f"{service_name}.json"), os.path.join("titles", f"{service_name}.json")]
+    else:
+        paths = [os.path.join("data", f"{service_name}.xlsx")]
+
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+class Prefetcher:
+    def __init__(self, function_map: Dict[str, Any], max_bytes: int=4 * 1024 * 1024, ttl: float=120.0):
+        self.function_map = function_map
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._results = OrderedDict()   # (command, service_name) -> (stored_at, mtime, result, size)
+        self._bytes = 0
+        self._pending = set()
+        self._active_requests = 0
+        self._lock = threading.Lock()
+        # A single background worker: prefetching must never compete with real requests for threads
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="invoice-prefetch")
+        self._histories = OrderedDict()   # session -> last three actions, least recently used first
+        self.stats = {"scheduled": 0, "hits": 0, "wasted": 0, "skipped": 0}
+
+    def request_started(self):
+        with self._lock:
+            self._active_requests += 1
+
+    def request_finished(self):
+        with self._lock:
+            self._active_requests -= 1
+
+    def observe(self, action: str, service_name: Optional[str]):
+        # Called after each chat request with the action that ran; same three-action window as update_last_actions.
+        # Only the history update happens on the request thread, the prediction runs on the prefetch worker.
+        if action == "unknown":
+            return
+        session_id = current_session()
+        with self._lock:
+            previous = self._histories.pop(session_id, [])
+            history = (previous + [action])[-3:]
+            self._histories[session_id] = history
+            while len(self._histories) > MAX_SESSIONS:
+                self._histories.popitem(last=False)
+        ctx = contextvars.copy_context()
+        self._executor.submit(ctx.run, self._after_action, previous, action, history, service_name)
+
+    def _after_action(self, previous, action: str, history, service_name: Optional[str]):
+        self._learn(previous, action)
+        self._predict(history, service_name)
+
+    def _learn(self, previous, action: str):
+        # The session's transition feeds the live n-gram counts that predict_action consults first
+        try:
+            from actionPredictor.ngram import get_ngram_model
+            get_ngram_model().update(previous, action)
+        except Exception as e:
+            print(f"Failed to update n-gram model: {e}")
+
+    def _predict(self, history, service_name: Optional[str]):
+        try:
+            from actionPredictor.predict import predict_action
+            predicted = predict_action(history)[0]
+        except Exception as e:
+            print(f"Prefetch prediction unavailable: {e}")
+            return
+
+        if predicted == 'list_services':
+            self.schedule(predicted, None)
+        elif predicted in PREFETCHABLE_COMMANDS and service_name:
+            self.schedule(predicted, service_name)
+
+    def schedule(self, command: str, service_name: Optional[str]):
+        key = (command, service_name)
+        with self._lock:
+            if self._active_requests > 0 or key in self._pending or key in self._results:
+                self.stats["skipped"] += 1
+                return
+            self._pending.add(key)
+            self.stats["scheduled"] += 1
+        # Copy the context so tools that need Flask's app context (url_for) still work on the worker
+        ctx = contextvars.copy_context()
+        self._executor.submit(ctx.run, self._run, command, service_name)
+
+    def _run(self, command: str, service_name: Optional[str]):
+        key = (command, service_name)
+        try:
+            mtime = _source_mtime(command, service_name)
+            func = self.function_map[command]
+            with service_lock(service_name).read():
+                result = func(service_name) if service_name else func()
+            if not isinstance(result, str) or is_error_result(result):
+                return
+            size = sys.getsizeof(result)
+            if size > self.max_bytes:
+                return
+            with self._lock:
+                self._store(key, (time.monotonic(), mtime, result, size))
+        except Exception as e:
+            print(f"Prefetch of {command} for {service_name} failed: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def _store(self, key, entry):
+        old = self._results.pop(key, None)
+        if old:
+            self._bytes -= old[3]
+        self._results[key] = entry
+        self._bytes += entry[3]
+        while self._bytes > self.max_bytes and self._results:
+            _, evicted = self._results.popitem(last=False)
+            self._bytes -= evicted[3]
+            self.stats["wasted"] += 1
+
+    def take(self, command: str, call_args: Dict[str, Any]):
+        key = (command, call_args.get("service_name"))
+        with self._lock:
+            entry = self._results.pop(key, None)
+            if entry is None:
+                return None
+            self._bytes -= entry[3]
+        stored_at, mtime, result, _ = entry
+        if time.monotonic() - stored_at > self.ttl or _source_mtime(*key) != mtime:
+            with self._lock:
+                self.stats["wasted"] += 1
+            return None
+        with self._lock:
+            self.stats["hits"] += 1
+        return result
+
+    def invalidate(self, service_name: Optional[str]=None):
+        with self._lock:
+            for key in [k for k in self._results if service_name is None or k[1] in (service_name, None)]:
+                self._bytes -= self._results.pop(key)[3]
+                self.stats["wasted"] += 1
+
+    def prefetch_report(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, stored=len(self._results), stored_bytes=self._bytes)
+        completed = stats["hits"] + stats["wasted"]
+        stats["hit_ratio"] = stats["hits"] / completed if completed else 0.0
+        stats["waste_ratio"] = stats["wasted"] / completed if completed else 0.0
+        return stats
@@ -0,0 +1,145 @@
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+SESSION_TTL_S = float(os.environ.get("INVOICE_AGENT_SESSION_TTL_S", "1800"))
+MAX_SESSIONS = int(os.environ.get("INVOICE_AGENT_MAX_SESSIONS", "1000"))
+DEFAULT_SESSION = "default"
+
+_current_session = contextvars.ContextVar("invoice_agent_session", default=DEFAULT_SESSION)
+
+def current_session() -> str:
+    return _current_session.get()
+
+class SessionState:
+    __slots__ = ("service_name", "customer", "tax_rates", "turn", "services_turn", "turn_services", "updated_at")
+
+    def __init__(self):
+        self.service_name = None    # service of the most recent command
+        self.customer = None        # (service, customer) of the most recent customer command
+        self.tax_rates = None       # (service, cgst, sgst) as the user last gave them
+        self.turn = 0
+        self.services_turn = 0
+        self.turn_services = []     # distinct services used during turn services_turn, the latest that used any
+        self.updated_at = time.monotonic()
+
+    def ambiguous(self) -> bool:
+        # A single request that touched several services (e.g. a multi-step plan) leaves no single active one
+        return len(self.turn_services) > 1
+
+class SessionStore:
+    """Per-session conversational state used to fill parameters a follow-up request leaves out."""
+
+    def __init__(self, max_sessions: int=MAX_SESSIONS, ttl_s: float=SESSION_TTL_S):
+        self.max_sessions = max_sessions
+        self.ttl_s = ttl_s
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"bound": 0, "hints": 0, "expired": 0, "evicted": 0}
+
+    def _state(self, session_id: str, create: bool=False) -> Optional[SessionState]:
+        # Caller holds the lock
+        now = time.monotonic()
+        state = self._sessions.get(session_id)
+        if state is not None and now - state.updated_at > self.ttl_s:
+            del self._sessions[session_id]
+            self.stats["expired"] += 1
+            state = None
+        if state is None:
+            if not create:
+                return None
+            state = self._sessions[session_id] = SessionState()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evicted"] += 1
+        self._sessions.move_to_end(session_id)
+        state.updated_at = now
+        return state
+
+    def begin_turn(self, session_id: str):
+        with self._lock:
+            self._state(session_id, create=True).turn += 1
+
+    def observe(self, session_id: str, command: str, call_args: Dict[str, Any]):
+        service = call_args.get("service_name")
+        customer = call_args.get("customer_name")
+        with self._lock:
+            state = self._state(session_id, create=True)
+            if service and command != 'add_service':
+                if state.services_turn != state.turn:
+                    state.services_turn = state.turn
+                    state.turn_services = []
+                if service not in state.turn_services:
+                    state.turn_services.append(service)
+                state.service_name = service
+            if service and customer:
+                state.customer = (service, customer)
+            if command == 'update_tax' and service and (call_args.get("cgst") is not None or call_args.get("sgst") is not None):
+                state.tax_rates = (service, call_args.get("cgst"), call_args.get("sgst"))
+
+    def fill(self, session_id: str, command: str, call_args: Dict[str, Any], missing: List[str],
+             reuse_tax_rates: bool=False) -> List[str]:
+        """Binds missing service_name/customer_name (and, when the request asked for the same tax, the last tax rates) from the session. Returns what was bound."""
+        with self._lock:
+            state = self._state(session_id)
+            if state is None:
+                return []
+            names = self._names(state, missing, call_args.get("service_name"))
+            call_args.update(names)
+            bound = list(names)
+            if reuse_tax_rates and command == 'update_tax' and state.tax_rates and call_args.get("cgst") is None and call_args.get("sgst") is None:
+                call_args["cgst"], call_args["sgst"] = state.tax_rates[1], state.tax_rates[2]
+                bound += ["cgst", "sgst"]
+            self.stats["bound"] += len(bound)
+        return bound
+
+    def _names(self, state: SessionState, missing: List[str], service_name: Optional[str]) -> Dict[str, str]:
+        # Caller holds the lock
+        names = {}
+        if "service_name" in missing and state.service_name and not state.ambiguous():
+            names["service_name"] = service_name = state.service_name
+        # A customer only carries over while the request is about the same service
+        if "customer_name" in missing and state.customer and state.customer[0] == service_name:
+            names["customer_name"] = state.customer[1]
+        return names
+
+    def fillable(self, session_id: str, missing: List[str], service_name: Optional[str]=None) -> List[str]:
+        """The service_name/customer_name among missing that fill() would bind, without binding them."""
+        with self._lock:
+            state = self._state(session_id)
+            return list(self._names(state, missing, service_name)) if state is not None else []
+
+    def candidates(self, session_id: str) -> List[str]:
+        with self._lock:
+            state = self._state(session_id)
+            return list(state.turn_services) if state is not None and state.ambiguous() else []
+
+    def context_hint(self, session_id: str) -> Optional[str]:
+        # Only an ambiguous state is worth the extra prompt tokens; otherwise binding is deterministic
+        services = self.candidates(session_id)
+        if not services:
+            return None
+        with self._lock:
+            self.stats["hints"] += 1
+        return f"(Context: the user was just working with the services {', '.join(services)}.)"
+
+    def session_report(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, sessions=len(self._sessions))
+
+session_store = SessionStore()
+
+@contextmanager
+def session_scope(session_id: Optional[str]):
+    # Everything a request runs (including plan steps and tools on worker threads that copy the context) sees this session
+    session_id = session_id or DEFAULT_SESSION
+    session_store.begin_turn(session_id)
+    token = _current_session.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _current_session.reset(token)
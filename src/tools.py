@@ -1,21 +1,101 @@
 import os
-import pandas as pd
-from flask import url_for
 import sys
 app_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'invoiceEditor'))
 
 if app_dir not in sys.path:
     sys.path.insert(0, app_dir)
 
-from update_excel import *
-from admin_fn import *
-
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
 import json
+from .workbook_cache import WorkbookCache
+from .columnar_store import columnar_store, PARQUET_AVAILABLE
+from .forms import FormRenderer
+from .name_index import NameIndex
+from .invoice_summary import InvoiceSummaries
+from .jobs import report_progress
+from .pagination import encode_cursor, decode_cursor, source_signature, read_xlsx_rows, read_parquet_rows, render_page
+
+# update_excel/admin_fn bring pandas, openpyxl and the rest of the invoice editor with them,
+# so they are imported by the first tool that calls into them rather than when this module loads
+def _invoice_editor_function(name):
+    import update_excel
+    import admin_fn
+    return getattr(admin_fn, name, None) or getattr(update_excel, name)
+
+def _invoice_editor(name):
+    def call(*args, **kwargs):
+        return _invoice_editor_function(name)(*args, **kwargs)
+    call.__name__ = name
+    return call
+
+your_invoice_function = _invoice_editor("your_invoice_function")
+get_services = _invoice_editor("get_services")
+get_customers = _invoice_editor("get_customers")
+load_service_columns = _invoice_editor("load_service_columns")
+load_service_titles = _invoice_editor("load_service_titles")
+copy_previous_data = _invoice_editor("copy_previous_data")
+get_service_tax = _invoice_editor("get_service_tax")
+update_service_tax = _invoice_editor("update_service_tax")
+
+workbook_cache = WorkbookCache(max_bytes=int(os.environ.get("INVOICE_AGENT_WORKBOOK_CACHE_MB", "256")) * 1024 * 1024)
+
+def _excel_path(service_name):
+    return os.path.join("data", f"{service_name}.xlsx")
+
+def read_sheet(path, sheet_name):
+    import pandas as pd
+    return workbook_cache.get(("sheet", path, sheet_name), [path], lambda: pd.read_excel(path, sheet_name=sheet_name))
+
+def service_sheet_names(service_name):
+    # With pyarrow this also brings the service's Parquet copy up to date, which view_sheet_page then reads from
+    path = _excel_path(service_name)
+
+    def loader():
+        if PARQUET_AVAILABLE:
+            return columnar_store.sheet_names(service_name)
+        import pandas as pd
+        with pd.ExcelFile(path) as workbook:
+            return workbook.sheet_names
+    return workbook_cache.get(("sheet_names", path), [path], loader, service=service_name)
+
+def cached_services():
+    return workbook_cache.get(("services",), ["data"], get_services)
+
+def cached_customers(service_name):
+    return workbook_cache.get(("customers", service_name), [_excel_path(service_name)], lambda: get_customers(service_name), service=service_name)
+
+def cached_service_columns(service_name):
+    return workbook_cache.get(("columns", service_name), [os.path.join("columns", f"{service_name}.json")], lambda: load_service_columns(service_name), service=service_name)
+
+def cached_service_titles(service_name):
+    return workbook_cache.get(("titles", service_name), [os.path.join("titles", f"{service_name}.json")], lambda: load_service_titles(service_name), service=service_name)
+
+form_renderer = FormRenderer(cached_service_columns, cached_service_titles)
+name_index = NameIndex(cached_services, cached_customers)
+# Invoices are materialized once and then kept current by the deltas below; your_invoice_function
+# only runs again when a workbook changes behind our back or a verification fails
+invoice_summaries = InvoiceSummaries(your_invoice_function, cached_service_titles, get_service_tax)
+
+def invalidate_service(service_name=None):
+    # Write paths call this after changing a service's files; the invoiceEditor customer add/edit routes
+    # call customer_saved instead, which also updates the materialized invoice
+    workbook_cache.invalidate(service_name)
+    form_renderer.invalidate(service_name)
+    name_index.invalidate(service_name)
+
+def customer_saved(service_name, customer_name, unit_price, usage_percent):
+    # For the invoiceEditor add_customer/update_customer routes, after the row has been written. The invoice
+    # line is recomputed from the workbook, so the row's values are only part of the routes' calling convention.
+    invalidate_service(service_name)
+    invoice_summaries.customer_saved(service_name)
+
+def verify_invoice(service_name, action='generate'):
+    # Full recomputation as a check on the materialized invoice; returns the differences it corrected
+    return invoice_summaries.verify(service_name, action)
 
 def add_service(service_name: str) -> str: 
     try:
+        from dateutil.relativedelta import relativedelta
         excel_path = os.path.join("data", f"{service_name}.xlsx")
         column_path = os.path.join("columns", f"{service_name}.json")
         titles_path = os.path.join("titles", f"{service_name}.json")
@@ -25,11 +105,13 @@ def add_service(service_name: str) -> str:
         current_month = now.strftime("%B")
         previous_month = (now - relativedelta(months=1)).strftime("%B")
         try:
-            df = pd.read_excel("template.xlsx", sheet_name=current_month)
+            df = read_sheet("template.xlsx", current_month)
         except Exception:
-            df = pd.read_excel("template.xlsx", sheet_name=previous_month)
+            df = read_sheet("template.xlsx", previous_month)
             
+        report_progress(0.2, "creating the workbook")
         df.to_excel(excel_path, sheet_name=current_month, index=False)
+        report_progress(0.7, "writing the column, category and title files")
         with open(column_path, 'w') as f:
             json.dump([], f, indent=4)
         with open(categories_path, 'w') as f:
@@ -40,43 +122,99 @@ def add_service(service_name: str) -> str:
         with open(titles_path, 'w') as f:
             json.dump(titles_config, f, indent=4)
         
+        invalidate_service(service_name)
         return f"✅ Service '{service_name}' added successfully!"
 
     except Exception as e:
         return f"❌ Error while interacting with browser: {e}"
     
+INVOICE_VIEWS = {
+    # action passed to your_invoice_function -> (title, message when empty)
+    'view': ("📄 Last Month's Invoice for {service}", "<p>⚠️ No invoice data found for <b>{service}</b> (last month).</p>"),
+    'generate': ("🧾 Current Month's Invoice for {service}", "<p>⚠️ No invoice data found for <b>{service}</b>.</p>"),
+}
+
+def _invoice_page(service_name, action, offset=0, page_size=10):
+    # Pages are cut from the materialized invoice; the grand totals row goes on the last page
+    import pandas as pd
+    title, empty_message = INVOICE_VIEWS.get(action, INVOICE_VIEWS['generate'])
+    summary = invoice_summaries.get(service_name, action)
+
+    if not summary.size():
+        return empty_message.format(service=service_name)
+
+    next_cursor = None
+    if offset + page_size < summary.size():
+        next_cursor = encode_cursor({"kind": "invoice", "service": service_name, "action": action,
+                                     "offset": offset + page_size, "page_size": page_size})
+    columns, rows = invoice_summaries.display_page(service_name, summary, offset, page_size, with_totals=next_cursor is None)
+    return render_page(title.format(service=service_name), pd.DataFrame(rows, columns=columns), next_cursor)
+
 def view_invoice_for_service(service_name: str, driver=None) -> str:
     try:
-        df = your_invoice_function(action='view', service=service_name)
-        
-        if df.empty:
-            return f"<p>⚠️ No invoice data found for <b>{service_name}</b> (last month).</p>"
-        
-        sample = df.head(5)
-        table_html = sample.to_html(index=False, classes="chatbot-invoice-table", border=1)
-
-        return f"<b>📄 Last Month's Invoice for {service_name}</b><br><br>{table_html}"
+        return _invoice_page(service_name, 'view', page_size=5)
     
     except Exception as e:
         return f"<p>❌ Failed to load invoice for <b>{service_name}</b>: {e}</p>"
     
 def view_current_invoice_for_service(service_name: str, driver=None, action='generate') -> str:
     try:
-        df = your_invoice_function(action, service_name)
-        if df.empty:
-            return f"<p>⚠️ No invoice data found for <b>{service_name}</b>.</p>"
-
-        sample = df.head(10)
-        table_html = sample.to_html(index=False, classes="chatbot-invoice-table", border=1)
-
-        return f"<b>🧾 Current Month's Invoice for {service_name}</b><br><br>{table_html}"
+        return _invoice_page(service_name, action, page_size=10)
     
     except Exception as e:
         return f"<p>❌ Failed to load invoice for <b>{service_name}</b>: {e}</p>"    
 
+def view_sheet_page(service_name: str, sheet_name: str=None, offset: int=0, page_size: int=25) -> str:
+    # Raw month sheet, streamed so the first page costs the same however many customers the service has
+    try:
+        path = _excel_path(service_name)
+        sheet_names = service_sheet_names(service_name)
+        by_name = {name.lower(): name for name in sheet_names}
+        if not sheet_name:
+            current_month = datetime.now().strftime("%B")
+            sheet_name = current_month if current_month in sheet_names or not sheet_names else sheet_names[-1]
+        elif sheet_name.lower() in by_name:
+            sheet_name = by_name[sheet_name.lower()]
+        else:
+            return f"<p>⚠️ <b>{service_name}</b> has no sheet named <b>{sheet_name}</b>. Available: {', '.join(sheet_names)}</p>"
+        signature = source_signature(path)
+
+        if PARQUET_AVAILABLE:
+            page, has_more = read_parquet_rows(columnar_store.sheet_path(service_name, sheet_name), offset, page_size)
+        else:
+            page, has_more = read_xlsx_rows(path, sheet_name, offset, page_size)
+
+        if page.empty and offset == 0:
+            return f"<p>⚠️ No data found in <b>{sheet_name}</b> for <b>{service_name}</b>.</p>"
+
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor({"kind": "sheet", "service": service_name, "sheet": sheet_name,
+                                         "offset": offset + page_size, "page_size": page_size, "signature": signature})
+        return render_page(f"📑 {sheet_name} data for {service_name}", page, next_cursor)
+
+    except Exception as e:
+        return f"<p>❌ Failed to load <b>{sheet_name}</b> for <b>{service_name}</b>: {e}</p>"
+
+def show_more(cursor: str) -> str:
+    state = decode_cursor(cursor)
+    if not isinstance(state, dict) or "kind" not in state:
+        return "❌ That page link is no longer valid."
+
+    try:
+        if state["kind"] == "invoice":
+            return _invoice_page(state["service"], state["action"], state["offset"], state["page_size"])
+
+        html = view_sheet_page(state["service"], state["sheet"], state["offset"], state["page_size"])
+        if state.get("signature") != source_signature(_excel_path(state["service"])):
+            html = "<p>⚠️ The workbook changed since the previous page.</p>" + html
+        return html
+    except Exception as e:
+        return f"<p>❌ Failed to load the next page: {e}</p>"
+
 def list_services():
     try:
-        services = get_services()
+        services = cached_services()
 
         if not services:
             return "⚠️ No services found."
@@ -91,7 +229,7 @@ def list_customers(service_name=None):
         if not service_name:
             return "❌ Please specify a service name to list customers."
         
-        customers = get_customers(service_name)
+        customers = cached_customers(service_name)
 
         if not customers:
             return f"⚠️ No customers found for service '{service_name}'."
@@ -103,136 +241,44 @@ def list_customers(service_name=None):
 
 def copy_previous(service_name):
     try:
+        report_progress(0.1, "copying last month's sheet")
         copy_previous_data(service=service_name)
+        report_progress(0.9, "refreshing cached data")
+        invalidate_service(service_name)
+        invoice_summaries.month_seeded(service_name)
         return f"Copied previous data for service: {service_name}!"
     except Exception as e:
         return f"Error while copying previous data: {e}"
     
 def add_customer_button(service_name):
     try:
-        columns = load_service_columns(service_name)
-        titles = load_service_titles(service_name)
-
-        html = f'<form id="addCustomerForm" method="POST" action="{url_for("add_customer")}" style="font-size: 0.85rem;">\n'
-        html += f'  <div>\n'
-        html += f'        <input type="hidden" name="service" value="{service_name}" />\n'
-        html += f'    <p style="margin-bottom: 8px; font-weight: bold;">Add Customer:</p>\n'
-
-        def render_input(label, field_id, input_type="text"):
-            return f'''    <div style="margin-bottom: 10px;">
-      <label for="{field_id}" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{label}</label>
-      <input type="{input_type}" id="{field_id}" name="{field_id}" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-    </div>\n'''
-
-        def get_title_by_id(titles, target_id):
-            for t in titles:
-                if t["id"] == target_id:
-                    return t["title"]
-            return None
-
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="customerName" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_1')}</label>
-                            <input type="text" id="customerName" name="customer_name" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n'''
-                        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="category" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_7')}</label>
-                            <input type="text" id="category" name="selected_id" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n'''
-        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="unitPrice" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_2')}</label>
-                            <input type="number" id="unitPrice" name="unit_price" step="10" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n'''
-        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="consumptionPeriod" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_3')}</label>
-                            <input type="text" id="consumptionPeriod" name="consumption_period" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n'''
-        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="usagePercent" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_4')}</label>
-                            <input type="text" id="usagePercent" name="usage_percent" min="0" max="100" step="1" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n''' 
-
-        for col in columns:
-            field_id = col["title"].lower().replace(" ", "_")
-            input_type = col.get("type", "text")
-            html += render_input(col["title"], field_id, input_type)
-
-        html += '    <button type="submit" style="font-size: 0.85rem; padding: 6px 12px;">Add Customer</button>\n'
-        html += '  </div>\n</form>'
-
-        return html
+        from flask import url_for
+        return form_renderer.render('add', url_for("add_customer"), service_name)
 
     except Exception as e:
         return { "error": str(e) }
     
 def edit_customer(service_name, customer_name):
     try:
-        columns = load_service_columns(service_name)
-        titles = load_service_titles(service_name)
-        
-        html = f'<form id="editCustomerForm" method="POST" action="{url_for("update_customer")}" style="font-size: 0.85rem;">\n'
-        html += f'  <div>\n'
-        html += f'        <input type="hidden" name="service" value="{service_name}" />\n'
-        html += f'        <input type="hidden" name="customer" value="{customer_name}" />\n'
-        html += f'    <p style="margin-bottom: 8px; font-weight: bold;">Edit Customer:</p>\n'
-
-        def render_input(label, field_id, input_type="text"):
-            return f'''    <div style="margin-bottom: 10px;">
-                <label for="{field_id}" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{label}</label>
-                <input type="{input_type}" id="{field_id}" name="{field_id}" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-            </div>\n'''
-        
-        def get_title_by_id(titles, target_id):
-            for t in titles:
-                if t["id"] == target_id:
-                    return t["title"]
-            return None
-        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                                <label for="category" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_7')}</label>
-                                <input type="text" id="category" name="category" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                            </div>\n'''
-            
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="unitPrice" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_2')}</label>
-                            <input type="number" id="unitPrice" name="cost" step="10" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n'''
-        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="consumptionPeriod" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_3')}</label>
-                            <input type="text" id="consumptionPeriod" name="period" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n'''
-        
-        html +=  f'''    <div style="margin-bottom: 10px;">
-                            <label for="usagePercent" style="display: block; font-size: 0.85rem; font-weight: 500; margin-bottom: 4px;">{get_title_by_id(titles, 'fixed_4')}</label>
-                            <input type="text" id="usagePercent" name="usage" min="0" max="100" step="1" style="width: 100%; padding: 6px; font-size: 0.85rem;" />
-                        </div>\n''' 
-        
-        for col in columns:
-                field_id = col["title"].lower().replace(" ", "_")
-                input_type = col.get("type", "text")
-                html += render_input(col["title"], field_id, input_type)
-
-        html += '    <button type="submit" style="font-size: 0.85rem; padding: 6px 12px;">Edit Customer</button>\n'
-        html += '  </div>\n</form>'
-        return html
+        from flask import url_for
+        return form_renderer.render('edit', url_for("update_customer"), service_name, customer_name)
     
     except Exception as e:
         return { "error": str(e) }
+
+def customer_form_etag(kind, service_name, customer_name=None):
+    # Lets the chat route answer If-None-Match for a form the UI already holds ('add' or 'edit')
+    return form_renderer.etag(kind, service_name, customer_name)
     
 def update_tax_rates(service_name: str, cgst: float = None, sgst: float = None, driver=None) -> str:
     try:
         if not service_name:
             return "❌ Service name is required."
-        service_name = service_name.capitalize()
         
-        if type(cgst) != float:
+        if cgst is not None and type(cgst) != float:
             cgst = cgst.strip().replace('%','')
             cgst = (float(cgst))/100
-        if type(sgst) != float:
+        if sgst is not None and type(sgst) != float:
             sgst = sgst.strip().replace('%','')
             sgst = (float(sgst))/100
 
@@ -243,7 +289,10 @@ def update_tax_rates(service_name: str, cgst: float = None, sgst: float = None,
         if sgst is None:
             sgst = current.get('sgst', 0.0)
 
+        report_progress(0.5, "saving the new rates")
         update_service_tax(service_name, cgst, sgst)
+        invalidate_service(service_name)
+        invoice_summaries.tax_updated(service_name, cgst, sgst)
 
         return f"✅ Tax rates updated for <strong>{service_name}</strong>: CGST={cgst * 100:.2f}%, SGST={sgst * 100:.2f}%"
     except Exception as e:
@@ -0,0 +1,183 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+TRACING_ENABLED = os.environ.get("INVOICE_AGENT_TRACING", "0") == "1"
+TRACE_PATH = os.environ.get("INVOICE_AGENT_TRACE_PATH", os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'traces.jsonl')))
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_trace = contextvars.ContextVar("invoice_agent_trace", default=None)
+
+class _NoopSpan:
+    # Shared by every call site while tracing is off, so a disabled span is one flag check
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "start")
+
+    def __init__(self, trace, name, attrs):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        record = {"name": self.name, "start_ms": round((self.start - self.trace["_start"]) * 1000, 3), "ms": round(elapsed_ms, 3)}
+        if self.attrs:
+            record.update(self.attrs)
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        self.trace["spans"].append(record)
+        metrics.observe_stage(self.name, elapsed_ms)
+        return False
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+def span(name: str, **attrs):
+    if not TRACING_ENABLED:
+        return _NOOP
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name, attrs)
+
+def record_tokens(prompt_tokens=None, output_tokens=None):
+    if not TRACING_ENABLED:
+        return
+    trace = _current_trace.get()
+    if trace is not None:
+        trace["prompt_tokens"] += prompt_tokens or 0
+        trace["output_tokens"] += output_tokens or 0
+    metrics.observe_tokens(prompt_tokens, output_tokens)
+
+@contextmanager
+def trace_request(user_input: str):
+    """Collects the spans of one chat request and writes them as a single JSONL line when it finishes."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+
+    trace = {
+        "trace_id": uuid.uuid4().hex[:16],
+        "timestamp": time.time(),
+        "input_chars": len(user_input),
+        "command": "unknown",
+        "status": "unknown",
+        "prompt_tokens": 0,
+        "output_tokens": 0,
+        "spans": [],
+        "_start": time.perf_counter()
+    }
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        total_ms = (time.perf_counter() - trace.pop("_start")) * 1000
+        trace["total_ms"] = round(total_ms, 3)
+        metrics.observe_request(trace["command"], total_ms)
+        _trace_logger().info(json.dumps(trace, default=str))
+
+_logger = None
+_logger_lock = threading.Lock()
+
+def _trace_logger():
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                logger = logging.getLogger("invoice_agent.traces")
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                handler = RotatingFileHandler(TRACE_PATH, maxBytes=20 * 1024 * 1024, backupCount=5, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+def _label(value) -> str:
+    # Label values are quoted strings in the text format; backslashes, quotes and newlines must be escaped
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(q * len(sorted_values)))
+    return sorted_values[index]
+
+class Metrics:
+    """Recent latency samples per command and per stage, rendered in the Prometheus text format."""
+
+    def __init__(self, window: int=2048):
+        self._lock = threading.Lock()
+        self._requests = defaultdict(lambda: deque(maxlen=window))
+        self._stages = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(int)
+        self._sums = defaultdict(float)
+        self._tokens = {"prompt": 0, "output": 0}
+
+    def observe_request(self, command, ms):
+        with self._lock:
+            self._requests[command].append(ms)
+            self._counts[("request", command)] += 1
+            self._sums[("request", command)] += ms
+
+    def observe_stage(self, stage, ms):
+        with self._lock:
+            self._stages[stage].append(ms)
+            self._counts[("stage", stage)] += 1
+            self._sums[("stage", stage)] += ms
+
+    def observe_tokens(self, prompt_tokens, output_tokens):
+        with self._lock:
+            self._tokens["prompt"] += prompt_tokens or 0
+            self._tokens["output"] += output_tokens or 0
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for metric, label, samples, kind in (
+                ("invoice_agent_request_latency_ms", "command", self._requests, "request"),
+                ("invoice_agent_stage_latency_ms", "stage", self._stages, "stage"),
+            ):
+                lines.append(f"# TYPE {metric} summary")
+                for name, values in sorted(samples.items()):
+                    ordered = sorted(values)
+                    value = _label(name)
+                    for q in QUANTILES:
+                        lines.append(f'{metric}{{{label}="{value}",quantile="{q}"}} {_quantile(ordered, q):.3f}')
+                    lines.append(f'{metric}_sum{{{label}="{value}"}} {self._sums[(kind, name)]:.3f}')
+                    lines.append(f'{metric}_count{{{label}="{value}"}} {self._counts[(kind, name)]}')
+            lines.append("# TYPE invoice_agent_llm_tokens_total counter")
+            lines.append(f'invoice_agent_llm_tokens_total{{kind="prompt"}} {self._tokens["prompt"]}')
+            lines.append(f'invoice_agent_llm_tokens_total{{kind="output"}} {self._tokens["output"]}')
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def register_metrics_endpoint(app, path: str="/metrics"):
+    # Call from the Flask app: register_metrics_endpoint(app)
+    def invoice_agent_metrics():
+        return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4"}
+    app.add_url_rule(path, "invoice_agent_metrics", invoice_agent_metrics)
@@ -0,0 +1,84 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Tuple
+
+def file_signature(paths: Iterable[str]) -> Tuple:
+    # (mtime, size) of every file a cached value was built from; a missing file has signature None
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+def estimate_size(value: Any) -> int:
+    # pandas is only looked up if something already imported it; a cached DataFrame implies it has been
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+class WorkbookCache:
+    """Size-bounded LRU of parsed workbooks and service configs, valid while the source files are unchanged."""
+
+    def __init__(self, max_bytes: int=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()   # key -> (service, signature, value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "evicted": 0, "invalidated": 0}
+
+    def get(self, key: Tuple, paths: Iterable[str], loader: Callable[[], Any], service: str=None):
+        # Cached values are shared between callers and must be treated as read-only
+        paths = list(paths)
+        signature = file_signature(paths)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] == signature:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return entry[2]
+                self._remove(key)
+                self.stats["stale"] += 1
+            self.stats["misses"] += 1
+
+        value = loader()
+        size = estimate_size(value)
+        # Only keep the value if the files didn't change while it was being loaded
+        if size <= self.max_bytes and file_signature(paths) == signature:
+            with self._lock:
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = (service, signature, value, size)
+                self._bytes += size
+                while self._bytes > self.max_bytes:
+                    self._remove(next(iter(self._entries)))
+                    self.stats["evicted"] += 1
+        return value
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[3]
+
+    def invalidate(self, service: str=None):
+        # Drops every entry for the service plus entries not tied to one service (e.g. the service list)
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if service is None or e[0] in (service, None)]:
+                self._remove(key)
+                self.stats["invalidated"] += 1
+
+    def cache_report(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats, entries=len(self._entries), bytes=self._bytes)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
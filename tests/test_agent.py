@@ -0,0 +1,165 @@
+from src import agent
+
+def test_prefetch_uses_the_resolved_service(monkeypatch):
+    observed = []
+    monkeypatch.setattr(agent.prefetcher, "observe", lambda command, service_name: observed.append((command, service_name)))
+    agent._prefetch_next({
+        "status": "success",
+        "interpretation": {"command": "list_customers", "parameters": {"service_name": "cloud hostng"}},
+        "call_args": {"service_name": "Cloud Hosting"},
+    })
+    assert observed == [("list_customers", "Cloud Hosting")]
+
+def test_llm_tokens_reach_the_request_trace(monkeypatch, capsys):
+    from src import tracing
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    interpreter = agent.CommandInterpreter(use_fast_path=False, use_cache=False)
+
+    class Chain:
+        def invoke(self, inputs):
+            interpreter._record_usage(5, {"prompt_eval_count": 7})
+            return {"command": "list_services", "confidence": 0.9, "parameters": {}}
+
+    interpreter._components = {"chain": Chain()}
+    trace = {"prompt_tokens": 0, "output_tokens": 0, "spans": []}
+    token = tracing._current_trace.set(trace)
+    try:
+        assert interpreter._interpret_llm("what can you do")["command"] == "list_services"
+    finally:
+        tracing._current_trace.reset(token)
+    assert (trace["prompt_tokens"], trace["output_tokens"]) == (7, 5)
+    assert "LLM usage" not in capsys.readouterr().out
+
+def test_bind_uses_the_interpreters_threshold():
+    interpretation = {"command": "list_services", "confidence": 0.7, "parameters": {}}
+    _, _, failure = agent.CommandInterpreter()._bind(interpretation)
+    assert failure["status"] == "failed"
+
+    cascade = agent.CascadeInterpreter(threshold=0.6)
+    func, call_args, failure = cascade._bind(interpretation)
+    assert failure is None
+    assert func is agent.function_map["list_services"] and call_args == {}
+
+def test_plan_steps_take_the_service_of_earlier_steps(monkeypatch):
+    import time
+    from src.session_context import session_scope, session_store
+    calls = []
+
+    def list_customers(service_name=None):
+        calls.append(("list_customers", service_name))
+        return f"customers of {service_name}"
+
+    def view_current_invoice(service_name, driver=None, action='generate'):
+        calls.append(("view_current_invoice", service_name))
+        return f"invoice of {service_name}"
+
+    monkeypatch.setitem(agent.function_map, "list_customers", list_customers)
+    monkeypatch.setitem(agent.function_map, "view_current_invoice", view_current_invoice)
+    def resolve_parameters(command, call_args):
+        # The first step is still binding when the second one starts
+        if command == "list_customers":
+            time.sleep(0.05)
+    monkeypatch.setattr(agent.name_index, "resolve_parameters", resolve_parameters)
+    monkeypatch.setattr(agent.prefetcher, "take", lambda command, call_args: None)
+
+    # The previous turn left Hosting as the session's service
+    with session_scope("plan-race"):
+        session_store.observe("plan-race", "list_customers", {"service_name": "Hosting"})
+
+    interpreter = agent.CommandInterpreter(use_cache=False)
+    with session_scope("plan-race"):
+        result = interpreter.execute_plan("list customers of Cloud and show current invoice")
+
+    assert result["status"] == "success"
+    assert sorted(calls) == [("list_customers", "Cloud"), ("view_current_invoice", "Cloud")]
+    assert result["steps"][1]["call_args"]["service_name"] == "Cloud"
+
+def test_plan_fill_keeps_explicit_services():
+    steps = agent.CommandInterpreter._fill_from_plan([
+        {"command": "list_customers", "parameters": {"service_name": "Cloud"}},
+        {"command": "view_current_invoice", "parameters": {"service_name": "Hosting"}},
+        {"command": "edit_customer", "parameters": {"customer_name": "Acme"}},
+        {"command": "list_services", "parameters": {}},
+    ])
+    assert [s["parameters"] for s in steps] == [
+        {"service_name": "Cloud"},
+        {"service_name": "Hosting"},
+        {"customer_name": "Acme", "service_name": "Hosting"},
+        {},
+    ]
+
+def test_sync_and_async_calls_share_one_inflight_limit(monkeypatch):
+    import asyncio
+    import threading
+    import time
+    monkeypatch.setattr(agent, "llm_slots", agent.InflightLimit(1))
+    interpreter = agent.CommandInterpreter(use_fast_path=False, use_cache=False)
+    lock = threading.Lock()
+    running, peak = [0], [0]
+
+    def generate():
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return {"command": "list_services", "confidence": 0.9, "parameters": {}}
+
+    class Chain:
+        def invoke(self, inputs):
+            return generate()
+
+        async def ainvoke(self, inputs):
+            return generate()
+
+    interpreter._components = {"chain": Chain()}
+    # Each thread gets its own event loop, like Flask's async views
+    threads = [threading.Thread(target=asyncio.run, args=(interpreter._ainterpret_llm("a"),)) for _ in range(2)]
+    threads.append(threading.Thread(target=interpreter._interpret_llm, args=("b",)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert peak[0] == 1
+
+def test_plan_generation_holds_an_llm_slot(monkeypatch):
+    from contextlib import contextmanager
+    held = []
+
+    class Limit:
+        @contextmanager
+        def hold(self):
+            held.append(True)
+            yield
+
+    monkeypatch.setattr(agent, "llm_slots", Limit())
+    interpreter = agent.CommandInterpreter(use_fast_path=False, use_cache=False)
+
+    class PlanChain:
+        def invoke(self, inputs):
+            assert held
+            return {"steps": [{"command": "list_services", "confidence": 0.9, "parameters": {}}]}
+
+    interpreter._components = {"plan_chain": PlanChain()}
+    steps = interpreter.interpret_plan("list services and then something else")
+    assert [s["command"] for s in steps] == ["list_services"]
+    assert interpreter.timings["cold"] is not None
+
+def test_unknown_commands_share_one_metric_label():
+    trace = {}
+    agent._finish_trace(trace, {"status": "failed", "interpretation": {"command": "delete everything\nnow"}})
+    assert trace["command"] == "unknown"
+    agent._finish_trace(trace, {"status": "success", "interpretation": {"command": "list_services"}})
+    assert trace["command"] == "list_services"
+
+def test_follow_ups_the_session_can_fill_are_not_escalated():
+    from src.session_context import session_scope, session_store
+    follow_up = {"command": "view_current_invoice", "confidence": 0.9, "parameters": {}}
+    with session_scope("escalation-fresh"):
+        assert agent.escalation_reason(follow_up) == "missing_parameters"
+    with session_scope("escalation-follow-up"):
+        session_store.observe("escalation-follow-up", "list_customers", {"service_name": "Cloud"})
+        assert agent.escalation_reason(follow_up) is None
+        other_customer = {"command": "edit_customer", "confidence": 0.9, "parameters": {"service_name": "Hosting"}}
+        assert agent.escalation_reason(other_customer) == "missing_parameters"
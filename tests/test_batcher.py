@@ -0,0 +1,86 @@
+import contextvars
+import json
+from types import SimpleNamespace
+
+from src import agent, tracing
+from src.batcher import InterpretationBatcher
+
+def interpretation(command, service_name=None):
+    parameters = {"service_name": service_name} if service_name else {}
+    return {"command": command, "confidence": 0.9, "parameters": parameters}
+
+class FakeLLM:
+    def __init__(self, reply):
+        self.reply = reply
+        self.prompts = []
+
+    def generate(self, prompts):
+        self.prompts.extend(prompts)
+        info = {"prompt_eval_count": 9, "eval_count": 30}
+        return SimpleNamespace(generations=[[SimpleNamespace(text=self.reply, generation_info=info)]])
+
+class FakeChain:
+    def __init__(self):
+        self.inputs = []
+
+    def invoke(self, inputs):
+        self.inputs.append(inputs["user_input"])
+        return interpretation("list_services")
+
+def make_interpreter(reply):
+    interpreter = agent.CommandInterpreter(use_fast_path=False, use_cache=False, batch_window_ms=0)
+    interpreter._components = {"llm": FakeLLM(reply), "chain": FakeChain()}
+    return interpreter
+
+def traced_context():
+    # A caller's context with its own request trace, as the batcher captures it
+    trace = {"prompt_tokens": 0, "output_tokens": 0, "spans": []}
+    context = contextvars.copy_context()
+    context.run(tracing._current_trace.set, trace)
+    return context, trace
+
+def test_batched_inputs_share_one_generation(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    reply = json.dumps([interpretation("list_customers", "Cloud"), interpretation("view_current_invoice", "Hosting")])
+    interpreter = make_interpreter(reply)
+    (first, first_trace), (second, second_trace) = traced_context(), traced_context()
+
+    results = interpreter._interpret_batch([("customers of cloud", first), ("hosting bill now", second)])
+
+    assert results == [interpretation("list_customers", "Cloud"), interpretation("view_current_invoice", "Hosting")]
+    assert len(interpreter.llm.prompts) == 1
+    prompt = interpreter.llm.prompts[0]
+    assert prompt.startswith(interpreter.batch_prefix)
+    assert '1. "customers of cloud"\n2. "hosting bill now"' in prompt
+    assert interpreter.chain.inputs == []
+    assert (first_trace["prompt_tokens"], first_trace["output_tokens"]) == (5, 15)
+    assert (second_trace["prompt_tokens"], second_trace["output_tokens"]) == (4, 15)
+
+def test_unusable_reply_falls_back_to_single_calls():
+    interpreter = make_interpreter("Sure! Here are the commands: list_services")
+    contexts = [contextvars.copy_context() for _ in range(2)]
+    results = interpreter._interpret_batch([("a", contexts[0]), ("b", contexts[1])])
+    assert results == [interpretation("list_services")] * 2
+    assert interpreter.chain.inputs == ["a", "b"]
+
+def test_only_uncovered_inputs_are_retried():
+    interpreter = make_interpreter(json.dumps([interpretation("list_customers", "Cloud"), "no idea"]))
+    contexts = [contextvars.copy_context() for _ in range(2)]
+    results = interpreter._interpret_batch([("a", contexts[0]), ("b", contexts[1])])
+    assert results == [interpretation("list_customers", "Cloud"), interpretation("list_services")]
+    assert interpreter.chain.inputs == ["b"]
+
+def test_parse_batch_reply_needs_one_object_per_input():
+    assert agent.parse_batch_reply('[{"command": "list_services"}]', 2) == [None, None]
+    assert agent.parse_batch_reply('not json [', 1) == [None]
+
+def test_queued_inputs_are_dispatched_together():
+    batches = []
+    batcher = InterpretationBatcher(lambda items: batches.append([i for i, _ in items]) or [i.upper() for i, _ in items], window_ms=50)
+    start = batcher._start
+    batcher._start = lambda: None   # Queue everything before the dispatcher runs
+    futures = [batcher.submit(text) for text in ("a", "b", "c")]
+    start()
+    assert [f.result(timeout=5) for f in futures] == ["A", "B", "C"]
+    assert batches == [["a", "b", "c"]]
+    assert batcher.batch_report()["largest_batch"] == 3
@@ -0,0 +1,106 @@
+import pytest
+
+from src.intent_matcher import COMMAND_PATTERNS, IntentMatcher, looks_compound
+
+matcher = IntentMatcher(COMMAND_PATTERNS)
+
+@pytest.mark.parametrize("text, command, parameters", [
+    ("list services", "list_services", {}),
+    ("show me all the available services", "list_services", {}),
+    ("what services do we have", "list_services", {}),
+    ("list customers for Cloud", "list_customers", {"service_name": "Cloud"}),
+    ("show all customers of service Web Hosting", "list_customers", {"service_name": "Web Hosting"}),
+    ("who are the customers of Cloud", "list_customers", {"service_name": "Cloud"}),
+    ("list customers", "list_customers", {}),
+    ("show current invoice for Cloud", "view_current_invoice", {"service_name": "Cloud"}),
+    ("show invoice for Cloud this month", "view_current_invoice", {"service_name": "Cloud"}),
+    ("show this month's invoice", "view_current_invoice", {}),
+    ("view last month invoice for Cloud", "view_last_invoice", {"service_name": "Cloud"}),
+    ("show invoice of Cloud for previous month", "view_last_invoice", {"service_name": "Cloud"}),
+    ("show previous invoice", "view_last_invoice", {}),
+    ("show its current invoice", "view_current_invoice", {}),
+    ("copy previous month data for Cloud", "copy_previous_data", {"service_name": "Cloud"}),
+    ("copy the last data", "copy_previous_data", {}),
+    ("add service Cloud", "add_service", {"service_name": "Cloud"}),
+    ("create a new service called Web Hosting", "add_service", {"service_name": "Web Hosting"}),
+    ("add customer to Cloud", "add_customer", {"service_name": "Cloud"}),
+    ("add a new customer", "add_customer", {}),
+    ("edit customer Acme in Cloud", "edit_customer", {"customer_name": "Acme", "service_name": "Cloud"}),
+    ("change the customer Acme Corp for Web Hosting", "edit_customer", {"customer_name": "Acme Corp", "service_name": "Web Hosting"}),
+    ("edit the same customer again", "edit_customer", {}),
+    ("edit customer again", "edit_customer", {}),
+    ("modify customer Acme", "edit_customer", {"customer_name": "Acme"}),
+    ("show the March sheet for Cloud", "view_sheet", {"sheet_name": "March", "service_name": "Cloud"}),
+    ("show sheet data for Web Hosting in april", "view_sheet", {"service_name": "Web Hosting", "sheet_name": "april"}),
+    ("view raw data of Cloud", "view_sheet", {"service_name": "Cloud"}),
+    ("show me the june sheet", "view_sheet", {"sheet_name": "june"}),
+    ("show more abc_123", "show_more", {"cursor": "abc_123"}),
+    ("job status 0123abcd", "job_status", {"job_id": "0123abcd"}),
+    ("update tax for Cloud to cgst 9% and sgst 9%", "update_tax", {"service_name": "Cloud", "cgst": "9%", "sgst": "9%"}),
+    ("apply the same tax to Hosting", "update_tax", {"service_name": "Hosting"}),
+    ("please list customers for Cloud.", "list_customers", {"service_name": "Cloud"}),
+    ("list customers for Cloud please thanks", "list_customers", {"service_name": "Cloud"}),
+    ("show current invoice for Cloud this month", "view_current_invoice", {"service_name": "Cloud"}),
+    ("show last invoice for Cloud for last month", "view_last_invoice", {"service_name": "Cloud"}),
+    ("show previous month invoice for Web Hosting previous month", "view_last_invoice", {"service_name": "Web Hosting"}),
+])
+def test_fixed_phrasings_match(text, command, parameters):
+    matched = matcher.match(text)
+    assert matched is not None
+    assert matched["command"] == command
+    assert matched["parameters"] == parameters
+    assert matched["confidence"] == 1.0
+
+@pytest.mark.parametrize("text", [
+    "list all services and their customers",       # list_services
+    "list customers for",                           # list_customers
+    "who are the customers for to Cloud",
+    "list customers for Cloud this month",
+    "show current invoice for from Cloud",          # view_current_invoice
+    "show last invoice for to Cloud",               # view_last_invoice
+    "show current invoice for Cloud for last month",
+    "show last invoice for Cloud this month",
+    "copy previous data from Cloud to Hosting",     # copy_previous_data
+    "add service for Cloud",                        # add_service
+    "create service to Hosting",
+    "add customer Acme to Cloud",                   # add_customer
+    "edit Acme in Cloud",                           # edit_customer without the word customer
+    "change Cloud",
+    "show the budget sheet for Cloud",              # view_sheet needs a month name
+    "show sheet for to Cloud",
+    "show more",                                    # show_more
+    "job status 12",                                # job_status
+    "update tax for Cloud",                         # update_tax without rates
+    "apply the same tax",
+])
+def test_ambiguous_requests_go_to_the_llm(text):
+    assert matcher.match(text) is None
+
+def test_tax_change_is_not_a_customer_edit():
+    assert matcher.match("change the tax for Cloud to cgst 9 sgst 9")["command"] == "update_tax"
+
+def test_same_tax_phrasing_asks_to_reuse_rates():
+    assert matcher.match("apply the same tax to Hosting")["reuse_tax_rates"] is True
+    assert "reuse_tax_rates" not in matcher.match("update tax for Cloud to cgst 9% and sgst 9%")
+
+def test_hit_rate_counts_matches_and_misses():
+    counting = IntentMatcher(COMMAND_PATTERNS)
+    counting.match("list services")
+    counting.match("do something clever")
+    assert counting.hit_rate() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+def test_match_plan_splits_on_separators():
+    steps = matcher.match_plan("list customers for Cloud and then show current invoice for Hosting")
+    assert [s["command"] for s in steps] == ["list_customers", "view_current_invoice"]
+    assert [s["parameters"]["service_name"] for s in steps] == ["Cloud", "Hosting"]
+
+def test_match_plan_needs_every_step_to_match():
+    assert matcher.match_plan("list customers for Cloud and summarize the trend") is None
+    assert matcher.match_plan("list customers for Cloud") is None
+
+def test_looks_compound():
+    assert looks_compound("list customers for Cloud; show current invoice")
+    assert looks_compound("list customers for Cloud and show current invoice")
+    assert not looks_compound("list customers for Cloud")
+    assert not looks_compound("show its current invoice")
+    assert not looks_compound("edit it again")
@@ -0,0 +1,56 @@
+from src.interpretation_cache import InterpretationCache
+
+LIST_CLOUD = {"command": "list_customers", "confidence": 0.95, "parameters": {"service_name": "Cloud"}}
+
+def make_cache(tmp_path, **kwargs):
+    return InterpretationCache(path=str(tmp_path / "cache.json"), **kwargs)
+
+def test_normalized_inputs_share_an_entry(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("List customers for Cloud!", LIST_CLOUD)
+    assert cache.get("  list   customers for cloud ") == LIST_CLOUD
+    assert cache.get("list customers for Hosting") is None
+    assert cache.hit_rate()["hits"] == 1
+
+def test_cgst_decimals_are_kept_apart():
+    assert InterpretationCache.normalize("cgst 9.5%") != InterpretationCache.normalize("cgst 95%")
+
+def test_returned_interpretations_are_copies(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("list customers for Cloud", LIST_CLOUD)
+    cache.get("list customers for Cloud")["parameters"]["service_name"] = "Hosting"
+    assert cache.get("list customers for Cloud")["parameters"]["service_name"] == "Cloud"
+
+def test_uncertain_and_failed_interpretations_are_not_cached(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("a", dict(LIST_CLOUD, confidence=0.5))
+    cache.put("b", {"command": "unknown", "confidence": 1.0, "parameters": {}})
+    cache.put("c", {"error": "timeout"})
+    assert cache.hit_rate()["rejected"] == 3
+    assert cache.get("a") is None
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("one", LIST_CLOUD)
+    cache.put("two", LIST_CLOUD)
+    cache.get("one")
+    cache.put("three", LIST_CLOUD)
+    assert cache.get("two") is None
+    assert cache.get("one") is not None
+    assert cache.hit_rate()["evicted"] == 1
+
+def test_expired_entries_miss(tmp_path):
+    cache = make_cache(tmp_path, ttl=-1)
+    cache.put("list customers for Cloud", LIST_CLOUD)
+    assert cache.get("list customers for Cloud") is None
+    assert cache.hit_rate()["expired"] == 1
+
+def test_entries_survive_a_restart(tmp_path):
+    cache = make_cache(tmp_path)
+    cache.put("list customers for Cloud", LIST_CLOUD)
+    cache.save()
+    assert make_cache(tmp_path).get("list customers for Cloud") == LIST_CLOUD
+
+def test_unreadable_file_starts_empty(tmp_path):
+    (tmp_path / "cache.json").write_text("not json")
+    assert make_cache(tmp_path).hit_rate()["size"] == 0
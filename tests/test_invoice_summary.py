@@ -0,0 +1,172 @@
+import pytest
+
+from src.invoice_summary import InvoiceSummaries, line_amount, month_key
+
+TITLES = [
+    {"id": "fixed_1", "title": "Customer Name"},
+    {"id": "fixed_2", "title": "Unit Price"},
+    {"id": "fixed_4", "title": "Usage %"},
+    {"id": "fixed_5", "title": "Amount"},
+    {"id": "fixed_6", "title": "Total"},
+]
+
+class Frame:
+    """The slice of the DataFrame interface InvoiceSummaries uses."""
+
+    def __init__(self, records):
+        self.records = records
+        self.columns = list(records[0]) if records else []
+        self.empty = not records
+
+    def to_dict(self, orient):
+        assert orient == "records"
+        return [dict(r) for r in self.records]
+
+class Workbook:
+    """Stand-in for the invoiceEditor data, with your_invoice_function computed the same way as in the benchmark stubs."""
+
+    def __init__(self):
+        self.rows = {"Cloud": [
+            {"Customer Name": "Acme", "Category": "Premium", "Unit Price": 200, "Usage %": 50},
+            {"Customer Name": "Globex", "Category": "Standard", "Unit Price": 90, "Usage %": 100},
+            {"Customer Name": "Initech", "Category": "Standard", "Unit Price": 40, "Usage %": 25},
+        ]}
+        self.taxes = {"Cloud": {"cgst": 0.09, "sgst": 0.09}}
+        self.invoice_calls = 0
+        self.totals_row = False
+
+    def your_invoice_function(self, action="generate", service=None):
+        self.invoice_calls += 1
+        tax = self.taxes[service]
+        records = []
+        for row in self.rows[service]:
+            amount = row["Unit Price"] * row["Usage %"] / 100
+            records.append(dict(row, Amount=amount, CGST=amount * tax["cgst"], SGST=amount * tax["sgst"],
+                                Total=amount * (1 + tax["cgst"] + tax["sgst"])))
+        if self.totals_row:
+            amount = sum(r["Amount"] for r in records)
+            records.append({"Customer Name": "Grand Total", "Category": None, "Unit Price": None, "Usage %": None,
+                            "Amount": amount, "CGST": amount * tax["cgst"], "SGST": amount * tax["sgst"],
+                            "Total": amount * (1 + tax["cgst"] + tax["sgst"])})
+        return Frame(records)
+
+    def invoice_view(self, service):
+        # What the pre-summary invoice view showed, rounded like the summary's recomputed figures
+        return [{k: round(v, 2) if isinstance(v, float) else v for k, v in r.items()}
+                for r in self.your_invoice_function("generate", service).records]
+
+@pytest.fixture
+def workbook():
+    return Workbook()
+
+@pytest.fixture
+def summaries(workbook, tmp_path):
+    return InvoiceSummaries(workbook.your_invoice_function, lambda service: TITLES,
+                            lambda service: workbook.taxes[service], data_dir=str(tmp_path))
+
+def page(summaries, service="Cloud", with_totals=False):
+    summary = summaries.get(service, "generate")
+    columns, rows = summaries.display_page(service, summary, 0, 100, with_totals)
+    return columns, [{k: round(v, 2) if isinstance(v, float) else v for k, v in row.items()} for row in rows]
+
+def test_line_amount():
+    assert line_amount("200", "50%") == 100.0
+    assert line_amount(None, 50) == 0.0
+    assert line_amount(float("nan"), 50) == 0.0
+
+def test_month_key():
+    from datetime import datetime
+    assert month_key("generate", datetime(2024, 1, 15)) == "2024-01"
+    assert month_key("view", datetime(2024, 1, 15)) == "2023-12"
+
+def test_totals_match_the_full_invoice(workbook, summaries):
+    summary = summaries.get("Cloud", "generate")
+    records = workbook.your_invoice_function("generate", "Cloud").records
+    totals = summary.totals()
+    assert totals["amount"] == pytest.approx(sum(r["Amount"] for r in records))
+    assert totals["cgst"] == pytest.approx(sum(r["CGST"] for r in records))
+    assert totals["total"] == pytest.approx(sum(r["Total"] for r in records))
+
+def test_view_keeps_the_invoice_columns(workbook, summaries):
+    columns, rows = page(summaries)
+    assert columns == ["Customer Name", "Category", "Unit Price", "Usage %", "Amount", "CGST", "SGST", "Total"]
+    assert rows == workbook.invoice_view("Cloud")
+
+def test_totals_rows_are_not_customers(workbook, summaries):
+    workbook.totals_row = True
+    summary = summaries.get("Cloud", "generate")
+    assert list(summary.lines) == ["Acme", "Globex", "Initech"]
+    assert summary.subtotal == pytest.approx(100 + 90 + 10)
+
+def test_invoice_without_the_customer_column_is_shown_as_computed(workbook, tmp_path):
+    titles = [dict(t, title="Client") if t["id"] == "fixed_1" else t for t in TITLES]
+    summaries = InvoiceSummaries(workbook.your_invoice_function, lambda service: titles,
+                                 lambda service: workbook.taxes[service], data_dir=str(tmp_path))
+    summary = summaries.get("Cloud", "generate")
+    assert summary.size() == 3 and not summary.lines
+    columns, rows = page(summaries)
+    assert columns == ["Customer Name", "Category", "Unit Price", "Usage %", "Amount", "CGST", "SGST", "Total"]
+    assert rows == workbook.invoice_view("Cloud")
+
+def test_grand_total_row(summaries):
+    _, rows = page(summaries, with_totals=True)
+    assert rows[-1]["Customer Name"] == "Grand Total"
+    assert rows[-1]["Amount"] == 200.0
+    assert rows[-1]["Total"] == 236.0
+
+def test_saved_customers_are_recomputed_not_guessed(workbook, summaries):
+    summaries.get("Cloud", "generate")
+    workbook.rows["Cloud"][1]["Usage %"] = 50
+    workbook.rows["Cloud"].append({"Customer Name": "Umbrella", "Category": None, "Unit Price": 10, "Usage %": 100})
+    summaries.customer_saved("Cloud")
+    summaries.customer_saved("Cloud")
+
+    _, rows = page(summaries)
+    assert rows == workbook.invoice_view("Cloud")
+    assert summaries.summary_report()["refreshes"] == 2
+    assert summaries.verify("Cloud") == []
+
+def test_seeded_month_is_recomputed_and_last_month_kept(workbook, summaries):
+    summaries.get("Cloud", "view")
+    calls = workbook.invoice_calls
+    workbook.rows["Cloud"][0]["Unit Price"] = 400   # The new sheet is not an exact copy
+    summaries.month_seeded("Cloud")
+
+    assert summaries.get("Cloud", "generate").lines["Acme"] == 200.0
+    summaries.get("Cloud", "view")
+    assert workbook.invoice_calls == calls + 1
+
+def test_removed_customer(workbook, summaries):
+    summaries.get("Cloud", "generate")
+    del workbook.rows["Cloud"][0]
+    summaries.customer_removed("Cloud", "Acme")
+    assert summaries.verify("Cloud") == []
+
+def test_tax_changes_are_picked_up_without_a_delta(workbook, summaries):
+    summaries.get("Cloud", "generate")
+    workbook.taxes["Cloud"] = {"cgst": 0.06, "sgst": 0.06}
+    _, rows = page(summaries)
+    assert rows == workbook.invoice_view("Cloud")
+
+def test_tax_updated_delta(workbook, summaries):
+    summaries.get("Cloud", "generate")
+    workbook.taxes["Cloud"] = {"cgst": 0.025, "sgst": 0.025}
+    summaries.tax_updated("Cloud", 0.025, 0.025)
+    assert summaries.get("Cloud", "generate").totals()["total"] == pytest.approx(210.0)
+    assert summaries.verify("Cloud") == []
+
+def test_verify_repairs_a_stale_summary(workbook, summaries):
+    summaries.get("Cloud", "generate")
+    workbook.rows["Cloud"][0]["Unit Price"] = 400   # Written without a delta
+    problems = summaries.verify("Cloud")
+    assert problems == ["Acme: 100.0 != 200.0"]
+    assert summaries.get("Cloud", "generate").lines["Acme"] == 200.0
+
+def test_summaries_are_reused_until_invalidated(workbook, summaries):
+    summaries.get("Cloud", "generate")
+    summaries.get("Cloud", "generate")
+    assert workbook.invoice_calls == 1
+    summaries.invalidate("Cloud")
+    summaries.get("Cloud", "generate")
+    assert workbook.invoice_calls == 2
+    assert summaries.summary_report()["hits"] == 1
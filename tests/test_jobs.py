@@ -0,0 +1,47 @@
+import threading
+import time
+
+from src.jobs import JobQueue, is_error_result, job_queue, job_status, report_progress
+
+def wait(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_is_error_result():
+    assert is_error_result("❌ Service name is required.")
+    assert is_error_result("<p>❌ Failed to load invoice</p>")
+    assert is_error_result("Error while copying previous data: boom")
+    assert is_error_result({"error": "no app context"})
+    assert not is_error_result("✅ Service 'Cloud' added successfully!")
+    assert not is_error_result(None)
+
+def test_error_results_fail_the_job():
+    queue = JobQueue(workers=1)
+    job = wait(queue, queue.submit("update_tax", "Cloud", lambda: "❌ Failed to update tax rates: boom", {}))
+    assert job["status"] == "failed"
+    assert "boom" in job["error"]
+
+def test_progress_is_reported_while_running():
+    queue = JobQueue(workers=1)
+    seen = []
+    submitted = threading.Event()
+    def tool():
+        report_progress(0.5, "halfway")
+        submitted.wait(5)
+        seen.append(queue.get(job_id))
+        return "✅ done"
+    job_id = queue.submit("copy_previous_data", "Cloud", tool, {})
+    submitted.set()
+    job = wait(queue, job_id)
+    assert job["status"] == "done"
+    assert (seen[0]["progress"], seen[0]["note"]) == (0.5, "halfway")
+
+def test_job_status_reports_failures():
+    job_id = job_queue.submit("add_service", "Cloud", lambda: "❌ Error while interacting with browser: denied", {})
+    wait(job_queue, job_id)
+    assert job_status(job_id).startswith("❌ Job")
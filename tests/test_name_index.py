@@ -0,0 +1,55 @@
+from src.name_index import NameIndex, edit_distance, normalize_name
+
+SERVICES = ["Cloud Hosting", "Web Hosting", "Email"]
+CUSTOMERS = {"Cloud Hosting": ["Acme Corp", "Globex", "Initech"]}
+
+def make_index(tmp_path, calls=None):
+    def load_customers(service):
+        if calls is not None:
+            calls.append(service)
+        return CUSTOMERS.get(service, [])
+    return NameIndex(lambda: SERVICES, load_customers, data_dir=str(tmp_path))
+
+def test_normalize_name():
+    assert normalize_name("Cloud Hosting") == normalize_name("cloud-hosting") == normalize_name("CloudHosting")
+
+def test_edit_distance():
+    assert edit_distance("hosting", "hostnig") == 2
+    assert edit_distance("cloud", "cloud") == 0
+    assert edit_distance("a", "abcdef", limit=2) == 3
+
+def test_exact_and_fuzzy_service_names(tmp_path):
+    index = make_index(tmp_path)
+    assert index.resolve_service("cloud hosting") == ("Cloud Hosting", [])
+    assert index.resolve_service("Cloud Hostng") == ("Cloud Hosting", [])
+
+def test_ambiguous_name_returns_suggestions(tmp_path):
+    canonical, suggestions = make_index(tmp_path).resolve_service("hosting")
+    assert canonical is None
+    assert set(suggestions) == {"Cloud Hosting", "Web Hosting"}
+
+def test_resolve_parameters_rewrites_names(tmp_path):
+    call_args = {"service_name": "cloudhosting", "customer_name": "acme corp"}
+    assert make_index(tmp_path).resolve_parameters("edit_customer", call_args) is None
+    assert call_args == {"service_name": "Cloud Hosting", "customer_name": "Acme Corp"}
+
+def test_resolve_parameters_reports_unknown_names(tmp_path):
+    message = make_index(tmp_path).resolve_parameters("list_customers", {"service_name": "Payroll"})
+    assert "couldn't find a service named 'Payroll'" in message
+    message = make_index(tmp_path).resolve_parameters("edit_customer", {"service_name": "Cloud Hosting", "customer_name": "Umbrella"})
+    assert "couldn't find a customer named 'Umbrella'" in message
+
+def test_new_services_are_not_resolved(tmp_path):
+    call_args = {"service_name": "payroll"}
+    assert make_index(tmp_path).resolve_parameters("add_service", call_args) is None
+    assert call_args == {"service_name": "payroll"}
+
+def test_customers_reload_after_invalidate(tmp_path):
+    calls = []
+    index = make_index(tmp_path, calls)
+    index.resolve_customer("Cloud Hosting", "globex")
+    index.resolve_customer("Cloud Hosting", "initech")
+    assert calls == ["Cloud Hosting"]
+    index.invalidate("Cloud Hosting")
+    index.resolve_customer("Cloud Hosting", "globex")
+    assert calls == ["Cloud Hosting", "Cloud Hosting"]
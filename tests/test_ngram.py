@@ -0,0 +1,41 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from actionPredictor.ngram import NgramModel
+
+def make_model(tmp_path, **kwargs):
+    return NgramModel(path=str(tmp_path / "ngram_counts.npz"), snapshot_interval_s=3600, **kwargs)
+
+def test_repeated_transitions_change_top_k(tmp_path):
+    model = make_model(tmp_path, min_support=2)
+    history = ["list_services", "list_customers", "view_current_invoice"]
+    for _ in range(2):
+        model.update(history, "edit_customer")
+    assert model.top_k(history, k=1)[0][0] == "edit_customer"
+
+    for _ in range(3):
+        model.update(history, "update_tax")
+    ranked = model.top_k(history, k=2)
+    assert [action for action, _ in ranked] == ["update_tax", "edit_customer"]
+    assert ranked[0][1] == pytest.approx(0.6)
+
+def test_backs_off_to_shorter_histories(tmp_path):
+    model = make_model(tmp_path, min_support=3)
+    for _ in range(3):
+        model.update(["add_service", "view_current_invoice"], "edit_customer")
+    # The full three-action history was never seen, its last two actions were
+    assert model.top_k(["list_services", "add_service", "view_current_invoice"], k=1)[0][0] == "edit_customer"
+    assert model.support(["list_services", "add_service", "view_current_invoice"]) == 0
+
+def test_unknown_actions_are_ignored(tmp_path):
+    model = make_model(tmp_path)
+    model.update(["list_services"], "show_more")
+    assert model.updates == 0
+    assert model.top_k(["list_services"]) == []
+
+def test_counts_survive_a_snapshot(tmp_path):
+    model = make_model(tmp_path, min_support=1)
+    model.update(["list_services"], "list_customers")
+    model.snapshot()
+    assert make_model(tmp_path, min_support=1).top_k(["list_services"], k=1)[0][0] == "list_customers"
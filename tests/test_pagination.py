@@ -0,0 +1,28 @@
+from src.intent_matcher import COMMAND_PATTERNS, IntentMatcher
+from src.pagination import decode_cursor, encode_cursor, source_signature
+
+STATE = {"kind": "sheet", "service": "Web Hosting", "sheet": "March", "offset": 25, "page_size": 25, "signature": [1, 2]}
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(STATE)) == STATE
+
+def test_cursor_survives_the_show_more_phrasing():
+    # The cursor is sent back as "show more <cursor>", so it must match the fast-path pattern untouched
+    cursor = encode_cursor(dict(STATE, service="Cloud & Co/ÄÖ"))
+    matched = IntentMatcher(COMMAND_PATTERNS).match(f"show more {cursor}")
+    assert matched["command"] == "show_more"
+    assert decode_cursor(matched["parameters"]["cursor"])["service"] == "Cloud & Co/ÄÖ"
+
+def test_invalid_cursors_decode_to_none():
+    assert decode_cursor("not a cursor!") is None
+    assert decode_cursor("") is None
+
+def test_source_signature_of_a_missing_file_is_none(tmp_path):
+    assert source_signature(str(tmp_path / "missing.xlsx")) is None
+
+def test_source_signature_changes_with_the_file(tmp_path):
+    path = tmp_path / "Cloud.xlsx"
+    path.write_bytes(b"a")
+    before = source_signature(str(path))
+    path.write_bytes(b"abc")
+    assert before is not None and source_signature(str(path)) != before
@@ -0,0 +1,45 @@
+import threading
+
+from src.prefetch import Prefetcher
+from src.session_context import session_scope
+
+def test_histories_are_kept_per_session():
+    prefetcher = Prefetcher({})
+    prefetcher._learn = lambda previous, action: None
+    prefetcher._predict = lambda history, service_name: None
+    with session_scope("alice"):
+        for action in ("list_services", "list_customers", "view_current_invoice", "edit_customer"):
+            prefetcher.observe(action, "Cloud")
+    with session_scope("bob"):
+        prefetcher.observe("list_services", None)
+        prefetcher.observe("unknown", None)
+    assert prefetcher._histories["alice"] == ["list_customers", "view_current_invoice", "edit_customer"]
+    assert prefetcher._histories["bob"] == ["list_services"]
+
+def test_prediction_runs_on_the_prefetch_worker():
+    prefetcher = Prefetcher({})
+    prefetcher._learn = lambda previous, action: None
+    seen = []
+    done = threading.Event()
+    def predict(history, service_name):
+        seen.append((threading.current_thread().name, history, service_name))
+        done.set()
+    prefetcher._predict = predict
+    with session_scope("carol"):
+        prefetcher.observe("list_customers", "Cloud")
+    assert done.wait(5)
+    thread_name, history, service_name = seen[0]
+    assert thread_name.startswith("invoice-prefetch")
+    assert (history, service_name) == (["list_customers"], "Cloud")
+
+def test_transitions_are_learned_with_the_previous_history():
+    prefetcher = Prefetcher({})
+    learned = []
+    done = threading.Event()
+    prefetcher._learn = lambda previous, action: learned.append((previous, action))
+    prefetcher._predict = lambda history, service_name: done.set() if len(learned) == 2 else None
+    with session_scope("dave"):
+        prefetcher.observe("list_services", None)
+        prefetcher.observe("list_customers", "Cloud")
+    assert done.wait(5)
+    assert learned == [([], "list_services"), (["list_services"], "list_customers")]
@@ -0,0 +1,79 @@
+from src.session_context import DEFAULT_SESSION, SessionStore, current_session, session_scope
+
+def test_follow_up_takes_the_last_service():
+    store = SessionStore()
+    store.begin_turn("s")
+    store.observe("s", "list_customers", {"service_name": "Cloud"})
+    store.begin_turn("s")
+    call_args = {}
+    assert store.fill("s", "view_current_invoice", call_args, ["service_name"]) == ["service_name"]
+    assert call_args == {"service_name": "Cloud"}
+
+def test_sessions_do_not_share_state():
+    store = SessionStore()
+    store.observe("a", "list_customers", {"service_name": "Cloud"})
+    call_args = {}
+    assert store.fill("b", "view_current_invoice", call_args, ["service_name"]) == []
+    assert call_args == {}
+
+def test_several_services_in_one_turn_are_ambiguous():
+    store = SessionStore()
+    store.begin_turn("s")
+    store.observe("s", "list_customers", {"service_name": "Cloud"})
+    store.observe("s", "list_customers", {"service_name": "Hosting"})
+    assert store.fill("s", "view_current_invoice", {}, ["service_name"]) == []
+    assert store.candidates("s") == ["Cloud", "Hosting"]
+    assert "Cloud, Hosting" in store.context_hint("s")
+
+def test_customer_only_carries_over_within_its_service():
+    store = SessionStore()
+    store.observe("s", "edit_customer", {"service_name": "Cloud", "customer_name": "Acme"})
+    same = {"service_name": "Cloud"}
+    assert store.fill("s", "edit_customer", same, ["customer_name"]) == ["customer_name"]
+    assert same["customer_name"] == "Acme"
+    other = {"service_name": "Hosting"}
+    assert store.fill("s", "edit_customer", other, ["customer_name"]) == []
+
+def test_same_tax_rates_apply_to_another_service():
+    store = SessionStore()
+    store.observe("s", "update_tax", {"service_name": "Cloud", "cgst": "9%", "sgst": "9%"})
+    call_args = {"service_name": "Hosting"}
+    store.fill("s", "update_tax", call_args, [], reuse_tax_rates=True)
+    assert call_args == {"service_name": "Hosting", "cgst": "9%", "sgst": "9%"}
+
+def test_tax_rates_are_only_reused_when_asked_for():
+    store = SessionStore()
+    store.observe("s", "update_tax", {"service_name": "Cloud", "cgst": "9%", "sgst": "9%"})
+    call_args = {"service_name": "Hosting"}
+    assert store.fill("s", "update_tax", call_args, ["cgst", "sgst"]) == []
+    assert call_args == {"service_name": "Hosting"}
+
+def test_new_service_is_not_the_active_one():
+    store = SessionStore()
+    store.observe("s", "add_service", {"service_name": "Payroll"})
+    assert store.fill("s", "list_customers", {}, ["service_name"]) == []
+
+def test_expired_and_evicted_sessions_are_forgotten():
+    expired = SessionStore(ttl_s=-1)
+    expired.observe("s", "list_customers", {"service_name": "Cloud"})
+    assert expired.fill("s", "list_customers", {}, ["service_name"]) == []
+
+    small = SessionStore(max_sessions=1)
+    small.observe("a", "list_customers", {"service_name": "Cloud"})
+    small.observe("b", "list_customers", {"service_name": "Hosting"})
+    assert small.fill("a", "list_customers", {}, ["service_name"]) == []
+    assert small.session_report()["evicted"] == 1
+
+def test_session_scope_sets_the_current_session():
+    assert current_session() == DEFAULT_SESSION
+    with session_scope("alice"):
+        assert current_session() == "alice"
+    with session_scope(None):
+        assert current_session() == DEFAULT_SESSION
+
+def test_fillable_matches_what_fill_binds():
+    store = SessionStore()
+    store.observe("s", "edit_customer", {"service_name": "Cloud", "customer_name": "Acme"})
+    assert store.fillable("s", ["service_name", "customer_name"]) == ["service_name", "customer_name"]
+    assert store.fillable("s", ["customer_name"], "Hosting") == []
+    assert store.fillable("nobody", ["service_name"]) == []
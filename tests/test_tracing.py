@@ -0,0 +1,8 @@
+from src.tracing import Metrics
+
+def test_label_values_are_escaped():
+    metrics = Metrics()
+    metrics.observe_request('say "hi"\\now\nplease', 12.0)
+    rendered = metrics.render()
+    assert 'command="say \\"hi\\"\\\\now\\nplease",quantile="0.5"} 12.000' in rendered
+    assert 'invoice_agent_request_latency_ms_count{command="say \\"hi\\"\\\\now\\nplease"} 1' in rendered